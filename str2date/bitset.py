@@ -2,7 +2,6 @@
 # coding: utf-8
 
 """ """
-import math
 
 _trailing_digit_table = [
 1,2,60,3,61,41,55,4,62,33,50,42,56,20,36,5,
@@ -13,6 +12,27 @@ _trailing_digit_table = [
 
 _mask = 0xffffffffffffffff # 2^64-1
 
+# _low_masks[n]: 下位n桁に1が立ったmask. 一年分の日数まで前もって作っておく
+_low_masks = [(1 << n) - 1 for n in range(367)]
+
+
+def _low_mask(n):
+    """ 下位n桁に1が立ったmaskを返す """
+    if n < len(_low_masks):
+        return _low_masks[n]
+    return (1 << n) - 1
+
+
+def _range_mask(start, end):
+    """
+    start桁目からend桁目までに1が立ったmaskを返す
+    (start, end) = (2, 4) なら 0b1110
+    """
+    assert 1 <= start
+    if start > end:
+        return 0
+    return _low_mask(end) ^ _low_mask(start-1)
+
 def _trailing_digit(x):
     """
     1が立っている末尾の桁を返す
@@ -40,9 +60,9 @@ def _get_nonzero_digits(x):
     """
     digits = []
     while x != 0:
-        digit = _trailing_digit(x)
-        digits.append(digit)
-        x = x & (x-1)
+        y = x & -x
+        digits.append(y.bit_length())
+        x ^= y
     return digits
 
 
@@ -63,8 +83,7 @@ def copy(bitset_from, bitset_to, digit_from_start, digit_from_end, digit_to_star
         bitset_toのペーストを開始する桁
     """
 
-    " (digit_from_start, digit_from_end) = (2, 4) なら 0b1110 "
-    mask = int(math.pow(2, digit_from_end)) - int(math.pow(2, digit_from_start-1))
+    mask = _range_mask(digit_from_start, digit_from_end)
     bits = bitset_from.filter(mask)
 
     n_shift = digit_from_start - digit_to_start
@@ -87,13 +106,245 @@ def copy(bitset_from, bitset_to, digit_from_start, digit_from_end, digit_to_star
     bitset_to.set_bits(to_bits)
 
 
-class BitSet:
-    MAX_DIGIT = 64
+class _BitSetBase:
+    """
+    BitSetとFrozenBitSetに共通する, 集合を変更しない操作.
+    継承先はdigit, bits, maskを持ち, _newを実装する
+    """
+    __slots__ = ()
+
+    def _new(self, bits):
+        """ 桁数が同じでbitsが立った, 自身と同じ種類の集合を返す """
+        raise NotImplementedError()
+
+    def __eq__(self, other):
+        if not isinstance(other, _BitSetBase):
+            return NotImplemented
+        return self.digit == other.digit and self.bits == other.bits
+
+    def __repr__(self):
+        return "%s(%d, %s)" % (type(self).__name__, self.digit, bin(self.bits))
+
+    def _other_bits(self, other):
+        assert isinstance(other, _BitSetBase) and other.digit == self.digit, "digit must be the same"
+        return other.bits
+
+    def __or__(self, other):
+        return self._new(self.bits | self._other_bits(other))
+
+    def __and__(self, other):
+        return self._new(self.bits & self._other_bits(other))
+
+    def __sub__(self, other):
+        return self._new(self.bits & ~self._other_bits(other))
+
+    def __xor__(self, other):
+        return self._new(self.bits ^ self._other_bits(other))
+
+    def __invert__(self):
+        return self._new(self.bits ^ self.mask)
+
+    def check(self, n):
+        """
+        n桁目が1ならTrue
+        """
+        assert(1 <= n <= self.digit)
+        y = (1 << (n-1)) & self.bits
+        return y > 0
+
+    def extract_range(self, start, end):
+        """
+        start桁目からend桁目までを取り出す
+
+        Returns
+        -------
+        bits: int
+            start桁目が1桁目になるようにずらした値
+        """
+        assert 1 <= start and end <= self.digit
+        return (self.bits & _range_mask(start, end)) >> (start - 1)
+
+    def select(self, k):
+        """
+        0でない桁のうち小さい方からk番目のものを返す. なければNone.
+        64桁毎のblockで1の数を数え, k番目を含まないblockは読み飛ばす
+
+        Arguments
+        ---------
+        k: int
+            1以上の順位
+        """
+        assert k >= 1
+        x = self.bits
+        offset = 0
+        while x != 0:
+            block = x & _mask
+            c = bin(block).count("1")
+            if k <= c:
+                for _ in range(k - 1):
+                    block &= block - 1
+                return offset + (block & -block).bit_length()
+            k -= c
+            x >>= 64
+            offset += 64
+        return None
+
+    def rank(self, n):
+        """
+        n桁目より小さい0でない桁の数を返す.
+        nが0でない桁ならselect(rank(n) + 1) == n
+
+        Arguments
+        ---------
+        n: int
+            1以上の桁
+        """
+        assert n >= 1
+        return bin(self.bits & _low_mask(n - 1)).count("1")
+
+    def get_nonzero_digits(self):
+        """
+        deprecated. activeを使う.
+        0でない桁のリストを返す
+
+        Returns
+        -------
+        digits: list of int
+            0でない桁のリスト
+        """
+        return self.active()
+
+    def filter(self, mask):
+        """
+        self.bitsにマスクした結果を返す
+
+        Parameters
+        ----------
+        mask: int
+            マスクビット. 値を取得したい桁に1を立てる
+        """
+        assert(mask >= 0)
+        return mask & self.bits
+
+    def active(self):
+        """
+        0でない桁のリストを返す
+
+        Returns
+        -------
+        digits: list of int
+            0でない桁のリスト
+        """
+        return list(self.iter_digits())
+
+    def iter_digits(self):
+        """
+        0でない桁を小さい順に返すiterator. listを作らずに一桁ずつ求める
+
+        Returns
+        -------
+        digits: iterator of int
+        """
+        x = self.bits
+        while x != 0:
+            y = x & -x
+            yield y.bit_length()
+            x ^= y
+
+    def first(self):
+        """
+        0でない桁のうち最小のものを返す. なければNone
+        """
+        if self.bits == 0:
+            return None
+        return (self.bits & -self.bits).bit_length()
+
+    def last(self):
+        """
+        0でない桁のうち最大のものを返す. なければNone
+        """
+        if self.bits == 0:
+            return None
+        return self.bits.bit_length()
+
+    def count(self):
+        """
+        0でない桁の数を返す
+        """
+        return bin(self.bits).count("1")
+
+    def next_after(self, n):
+        """
+        0でない桁のうちnより大きい最小のものを返す. なければNone
+
+        Arguments
+        ---------
+        n: int
+            0以上の桁. 0ならfirstと同じ
+        """
+        assert n >= 0
+        x = self.bits >> n
+        if x == 0:
+            return None
+        return n + (x & -x).bit_length()
+
+    def prev_before(self, n):
+        """
+        0でない桁のうちnより小さい最大のものを返す. なければNone
+
+        Arguments
+        ---------
+        n: int
+            1以上の桁. digit+1ならlastと同じ
+        """
+        assert n >= 1
+        x = self.bits & ((1 << (n - 1)) - 1)
+        if x == 0:
+            return None
+        return x.bit_length()
+
+
+class BitSet(_BitSetBase):
+    """
+    digit桁のbit列で1からdigitまでの整数の集合を管理.
+    pythonのintを使うので桁数に上限はない
+
+    Arguments
+    ---------
+    digit: int
+        桁数
+    """
+    __slots__ = ("digit", "bits", "mask")
+    # 変更できるので, setと同じくhashableにしない
+    __hash__ = None
+
     def __init__(self, digit):
-        assert(0 < digit <= BitSet.MAX_DIGIT)
+        assert(0 < digit)
         self.digit = digit
         self.bits = 0
-        self.mask = int(math.pow(2, digit))-1
+        self.mask = _low_mask(digit)
+
+    def _new(self, bits):
+        """ 桁数が同じでbitsが立ったBitSetを返す """
+        result = BitSet(self.digit)
+        result.bits = bits
+        return result
+
+    def __ior__(self, other):
+        self.bits |= self._other_bits(other)
+        return self
+
+    def __iand__(self, other):
+        self.bits &= self._other_bits(other)
+        return self
+
+    def __isub__(self, other):
+        self.bits &= ~self._other_bits(other)
+        return self
+
+    def __ixor__(self, other):
+        self.bits ^= self._other_bits(other)
+        return self
 
     def add(self, n):
         """
@@ -103,14 +354,6 @@ class BitSet:
         mask = 1 << (n-1)
         self.bits |= mask
 
-    def check(self, n):
-        """
-        n桁目が1ならTrue
-        """
-        assert(1 <= n <= self.digit)
-        y = (1 << (n-1)) & self.bits
-        return y > 0
-
     def set(self, n):
         """
         n桁目に1を立てる
@@ -160,17 +403,19 @@ class BitSet:
         mask = 1 << (n - 1)
         self.bits &= ~mask
 
-    def get_nonzero_digits(self):
+    def set_range(self, start, end):
         """
-        deprecated. activeを使う.
-        0でない桁のリストを返す
+        start桁目からend桁目までを1にする
+        """
+        assert 1 <= start and end <= self.digit
+        self.bits |= _range_mask(start, end)
 
-        Returns
-        -------
-        digits: list of int
-            0でない桁のリスト
+    def clear_range(self, start, end):
+        """
+        start桁目からend桁目までを0にする
         """
-        return _get_nonzero_digits(self.bits)
+        assert 1 <= start and end <= self.digit
+        self.bits &= ~_range_mask(start, end)
 
     def set_bits(self, bits):
         """
@@ -183,25 +428,50 @@ class BitSet:
         """
         self.bits |= bits
 
-    def filter(self, mask):
+    def freeze(self):
         """
-        self.bitsにマスクした結果を返す
-
-        Parameters
-        ----------
-        mask: int
-            マスクビット. 値を取得したい桁に1を立てる
+        同じ要素を持つFrozenBitSetを返す
         """
-        assert(mask >= 0)
-        return mask & self.bits
+        return FrozenBitSet(self.digit, self.bits)
 
-    def active(self):
-        """
-        0でない桁のリストを返す
 
-        Returns
-        -------
-        digits: list of int
-            0でない桁のリスト
+class FrozenBitSet(_BitSetBase):
+    """
+    変更できないBitSet. hashableなのでdictのkeyにでき, threadの間でcopyせずに共有できる
+
+    Arguments
+    ---------
+    digit: int
+        桁数
+    bits: int, optional
+        1を立てる桁. digit桁を超える部分は無視する
+    """
+    __slots__ = ("digit", "bits", "mask", "_hash")
+
+    def __init__(self, digit, bits=0):
+        assert(0 < digit)
+        mask = _low_mask(digit)
+        object.__setattr__(self, "digit", digit)
+        object.__setattr__(self, "bits", bits & mask)
+        object.__setattr__(self, "mask", mask)
+        object.__setattr__(self, "_hash", hash((digit, bits & mask)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenBitSet is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (FrozenBitSet, (self.digit, self.bits))
+
+    def _new(self, bits):
+        return FrozenBitSet(self.digit, bits)
+
+    def thaw(self):
+        """
+        同じ要素を持つ変更可能なBitSetを返す
         """
-        return _get_nonzero_digits(self.bits)
+        result = BitSet(self.digit)
+        result.bits = self.bits
+        return result
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" utf-8のbyte列 (bytes, memoryview, mmap) をdecodeせずにtoken列に変換する
+大きなログファイルをmmapし, tokenを含む行だけをdecodeする用途に使う
+"""
+
+import re
+
+from str2date.lexer import (Token, _KANJI_DIGITS, _LARGE_UNITS, _SMALL_UNITS,
+                            _resolve, _scan_numeral)
+
+# byte列で扱う数値表現の文字. unicodeの十進数字のうち全角数字以外は扱わない
+_NUMERAL_BYTES = set(
+    c.encode("utf-8") for c in
+    "０１２３４５６７８９" + "".join(map(chr, _KANJI_DIGITS)) +
+    "".join(_SMALL_UNITS) + "".join(_LARGE_UNITS))
+
+
+def _char_len(lead):
+    """ 先頭のbyteからutf-8の一文字のbyte数を求める """
+    if lead < 0x80:
+        return 1
+    if lead < 0xe0:
+        return 2 if lead >= 0xc0 else 1
+    if lead < 0xf0:
+        return 3
+    return 4
+
+
+def _is_numeral(buf, pos, end):
+    lead = buf[pos]
+    if 0x30 <= lead <= 0x39:
+        return 1
+    n = _char_len(lead)
+    if n == 3 and pos + 3 <= end and bytes(buf[pos:pos+3]) in _NUMERAL_BYTES:
+        return 3
+    return 0
+
+
+def _char_at(buf, pos, end):
+    """ posから始まる一文字をdecodeする. posが範囲外ならNone """
+    if pos >= end:
+        return None
+    n = _char_len(buf[pos])
+    return bytes(buf[pos:pos+n]).decode("utf-8", "replace")
+
+
+def _char_before(buf, pos, start):
+    """ posの直前の一文字をdecodeする. posが先頭ならNone """
+    if pos <= start:
+        return None
+    i = pos - 1
+    while i > start and 0x80 <= buf[i] < 0xc0:
+        i -= 1
+    return bytes(buf[i:pos]).decode("utf-8", "replace")
+
+
+class ByteTrie:
+    """
+    tokenの文字列をutf-8でencodeしたbyte列のtrie
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+    """
+
+    def __init__(self, tokens):
+        self.children = [{}]
+        self.values = [None]
+        lead_bytes = set(range(0x30, 0x3a))
+        lead_bytes.update(b[0] for b in _NUMERAL_BYTES)
+        for token, normalized in tokens.items():
+            encoded = token.encode("utf-8")
+            lead_bytes.add(encoded[0])
+            node = 0
+            for b in encoded:
+                child = self.children[node].get(b)
+                if child is None:
+                    child = len(self.children)
+                    self.children[node][b] = child
+                    self.children.append({})
+                    self.values.append(None)
+                node = child
+            self.values[node] = normalized
+        self.disambiguation_map = getattr(tokens, "disambiguation_map", None)
+        # tokenか数値表現が始まり得る位置を探すためのpattern. 先頭のbyteは文字の境界にしか現れない
+        self.candidate = re.compile(
+            b"[" + b"".join(re.escape(bytes([b])) for b in sorted(lead_bytes)) + b"]")
+
+    def longest_match(self, buf, pos, end):
+        """
+        buf[pos:end]の先頭に一致するtokenを最長一致で探す
+
+        Returns
+        -------
+        match: (int, str) or None
+            一致したtokenの終端のbyte位置と正規化された表現. なければNone
+        """
+        children = self.children
+        values = self.values
+        match = None
+        node = 0
+        for i in range(pos, end):
+            node = children[node].get(buf[i])
+            if node is None:
+                break
+            if values[node] is not None:
+                match = (i + 1, values[node])
+        return match
+
+
+def lex_bytes(buf, tokens, disambiguation_map=None, start=0, end=None):
+    """
+    utf-8のbyte列buf[start:end]をlexerと同じ規則でtoken列に変換する.
+    tokenも数値表現も始まり得ない部分は正規表現で読み飛ばす
+
+    Arguments
+    ---------
+    buf: bytes, bytearray, memoryview or mmap
+    tokens: ByteTrie
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+        Noneの場合, tokensが持っていればそれを使う
+    start: int, optional
+    end: int or None, optional
+        読み込む範囲のbyte位置. endがNoneならbufの末尾まで
+
+    Returns
+    -------
+    result: list of Token
+        tokenとbyte位置のlist. startとendはbuf中のbyte位置
+    """
+    if end is None:
+        end = len(buf)
+    if disambiguation_map is None:
+        disambiguation_map = tokens.disambiguation_map
+    result = []
+    pos = start
+    while pos < end:
+        m = tokens.candidate.search(buf, pos, end)
+        if m is None:
+            break
+        pos = m.start()
+
+        # 数値表現を取得する
+        n = _is_numeral(buf, pos, end)
+        if n > 0:
+            numeral_end = pos
+            while n > 0:
+                numeral_end += n
+                n = _is_numeral(buf, numeral_end, end) if numeral_end < end else 0
+            run = bytes(buf[pos:numeral_end]).decode("utf-8")
+            result.append(Token(_scan_numeral(run, 0)[0], pos, numeral_end))
+            pos = numeral_end
+            continue
+
+        # 数値以外の表現を取得する
+        match = tokens.longest_match(buf, pos, end)
+        if match is None:
+            pos += _char_len(buf[pos])
+            continue
+        token_end, token_id = match
+        token = bytes(buf[pos:token_end]).decode("utf-8")
+        prev_c = _char_before(buf, pos, start)
+        next_c = _char_at(buf, pos + _char_len(buf[pos]), end)
+        resolved = _resolve(token, token_id, prev_c, next_c, disambiguation_map)
+        for resolved_id in resolved[:-1]:
+            result.append(Token(resolved_id, pos, pos))
+        result.append(Token(resolved[-1], pos, token_end))
+        pos = token_end
+    return result
+
+
+def iter_matching_lines(buf, tokens, disambiguation_map=None):
+    """
+    bufを行毎にlex_bytesにかけ, tokenを含む行だけを返す
+
+    Arguments
+    ---------
+    buf: bytes, bytearray or mmap
+    tokens: ByteTrie
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+
+    Returns
+    -------
+    lines: iterator of (int, int, list of Token)
+        行の開始と終端 (改行を含まない) のbyte位置と, 行中のtokenのlist
+    """
+    start = 0
+    size = len(buf)
+    while start < size:
+        end = buf.find(b"\n", start)
+        if end < 0:
+            end = size
+        result = lex_bytes(buf, tokens, disambiguation_map, start, end)
+        if len(result) > 0:
+            yield start, end, result
+        start = end + 1
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" lexerなどの結果を再利用するためのcache """
+
+from collections import OrderedDict, namedtuple
+import json
+import threading
+
+from str2date.lexer import lexer
+from str2date.trie import TokenTrie, items_fingerprint
+
+# version: 辞書を読み込む度に増える番号. processやregistry毎に1から数える
+# fingerprint: 辞書とdisambiguation_mapの内容を表すhash. processやregistryが違っても内容が同じなら一致する
+Snapshot = namedtuple("Snapshot", ["version", "fingerprint", "tokens", "disambiguation_map"])
+
+
+class LRUCache:
+    """
+    要素数に上限のあるLRU cache. hit, miss, evictionの回数を数える
+
+    Arguments
+    ---------
+    maxsize: int
+        保持する要素数の上限
+
+    Properties
+    ----------
+    hits: int
+    misses: int
+    evictions: int
+        上限を超えたために捨てた要素の数
+    """
+
+    def __init__(self, maxsize=4096):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        keyに対応する値を返す. なければdefaultを返す
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        keyに対応する値を登録する. 上限を超えた場合は最も古く参照された要素を捨てる
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats: dict of {str: int}
+            hits, misses, evictions, size
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries)}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def dictionary_fingerprint(tokens, disambiguation_map=None):
+    """
+    token辞書とdisambiguation_mapの内容を表すhashを求める.
+    TokenTrieやMappedTokensは構築時の値を使い回すが,
+    dictの場合は呼び出しの度に中身から計算する
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+
+    Returns
+    -------
+    fingerprint: str
+    """
+    fingerprint = getattr(tokens, "fingerprint", None)
+    if fingerprint is None:
+        fingerprint = items_fingerprint(tokens.items())
+    if disambiguation_map is None or disambiguation_map is getattr(tokens, "disambiguation_map", None):
+        return fingerprint
+    return fingerprint + json.dumps(disambiguation_map, sort_keys=True)
+
+
+class LexerCache:
+    """
+    token辞書に対するlexerの結果のLRU cache.
+    entryは(辞書のfingerprint, text)をkeyにするので, 辞書が差し替えられると自動的に別のentryになる.
+    fingerprintはSnapshotが持っているものを使い, 呼び出し毎に辞書を読み直すことはない
+
+    Arguments
+    ---------
+    dictionary: TokenRegistry, callable, dict of {str: str}, TokenTrie or MappedTokens
+        TokenRegistryかSnapshotを返す関数の場合は呼び出し毎に現在のSnapshotを使う.
+        それ以外は構築時の辞書に固定し, dictはTokenTrieにコンパイルする
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+        辞書を固定する場合に使う. Noneの場合, 辞書が持っていればそれを使う
+    maxsize: int
+        保持するentryの数の上限
+
+    Properties
+    ----------
+    fingerprint: str
+        現在の辞書とdisambiguation_mapの内容を表すhash
+    """
+
+    def __init__(self, dictionary, disambiguation_map=None, maxsize=4096):
+        if hasattr(dictionary, "snapshot"):
+            self._current = lambda: dictionary.snapshot
+        elif callable(dictionary):
+            self._current = dictionary
+        else:
+            if isinstance(dictionary, dict):
+                dictionary = TokenTrie(dictionary)
+            if disambiguation_map is None:
+                disambiguation_map = getattr(dictionary, "disambiguation_map", None)
+            fingerprint = dictionary_fingerprint(dictionary, disambiguation_map)
+            snapshot = Snapshot(1, fingerprint, dictionary, disambiguation_map)
+            self._current = lambda: snapshot
+        self.cache = LRUCache(maxsize)
+
+    @property
+    def snapshot(self):
+        """
+        現在の辞書のSnapshot
+        """
+        return self._current()
+
+    @property
+    def fingerprint(self):
+        return self._current().fingerprint
+
+    def lexer(self, text):
+        """
+        現在の辞書でのlexerと同じ. 結果は変更できないようにtupleで返す
+
+        Returns
+        -------
+        result: tuple of str
+        """
+        snapshot = self._current()
+        key = (snapshot.fingerprint, text)
+        result = self.cache.get(key)
+        if result is None:
+            result = tuple(lexer(text, snapshot.tokens, snapshot.disambiguation_map))
+            self.cache.put(key, result)
+        return result
+
+    def stats(self):
+        return self.cache.stats()
@@ -5,80 +5,25 @@
 from datetime import datetime
 from enum import Enum
 
-from str2date.bitset import BitSet
+from str2date.bitset import BitSet, FrozenBitSet
 
 
 class UnitType:
     DAY, WDAY, WEEK, MONTH, YEAR = range(5)
 
 
-class Datetime:
-    def __init__(self):
-        self.units = [None for _ in range(4)]
-        self.units[UnitType.DAY] = BitSet(31) # 31桁のbit. 桁が日付に対応
-        self.units[UnitType.WDAY] = BitSet(7) # 7桁のbit. 桁が日付に対応
-        """
-        54桁のbit. date.isocalendar()のweekに準拠
-        https://docs.python.org/3/library/datetime.html#datetime.date.isocalendar
-        """
-        self.units[UnitType.WEEK] = BitSet(54)
-        self.units[UnitType.MONTH] = BitSet(12) # 12桁のbit. 桁が月に対応
-        self.year = None # ひとまずは年は範囲を持たないとする
-
-    def set(self, n, unit):
-        """
-        特定の単位 (year, month, week, wday, day) を特定の値にする
-
-        Arguments
-        ---------
-        n: int
-            指定したい値.
-        unit: UnitType
-            時間表現の単位. 年, 月, 週, 曜日, 日
-        """
-        if unit == UnitType.YEAR:
-            self.year = n
-            return
-        self.units[unit].set(n)
-
-    def set_by_datetime(self, d):
-        self.units[UnitType.DAY].set(d.day)
-        self.units[UnitType.WDAY].set(d.isoweekday())
-        self.units[UnitType.WEEK].set(d.isocalendar()[1])
-        self.units[UnitType.MONTH].set(d.month)
-        self.year = d.year
-
-    def add(self, n, unit):
-        """
-        特定の単位 (month, week, wday, day) に特定の値を追加する
-        現時点ではyearはサポートしない
+class _DatetimeBase:
+    """
+    DatetimeとFrozenDatetimeに共通する, 値を変更しない操作.
+    継承先はunitsとyearを持つ
+    """
+    __slots__ = ()
 
-        Arguments
-        ---------
-        n: int
-            指定したい値.
-        unit: UnitType
-            時間表現の単位. 年, 月, 週, 曜日, 日
-        """
-        if unit == UnitType.YEAR:
-            raiseError("`unit` must not be `UnitType.YEAR`")
-        self.units[unit].add(n)
-
-    def shift(self, n, unit):
-        """
-        特定の単位 (month, week, wday, day) を特定の値だけずらす
-
-        Arguments
-        ---------
-        n: int
-            指定したい値.
-        unit: UnitType
-            時間表現の単位. 年, 月, 週, 曜日, 日
-        """
-        if unit == UnitType.YEAR:
-            self.year += n
-            return
-        self.units[unit].shift(n)
+    def __eq__(self, other):
+        if not isinstance(other, _DatetimeBase):
+            return NotImplemented
+        return self.year == other.year and all(
+            a == b for a, b in zip(self.units, other.units))
 
     def get(self, unit):
         """
@@ -98,7 +43,7 @@ class Datetime:
             if self.year is None:
                 return []
             return [self.year]
-        return self.units[unit].get_nonzero_digits()
+        return self.units[unit].active()
 
     def days(self):
         """
@@ -188,3 +133,119 @@ class Datetime:
             if year != self.year:
                 return False
         return True
+
+
+class Datetime(_DatetimeBase):
+    __slots__ = ("units", "year")
+    # 変更できるので, hashableにしない
+    __hash__ = None
+
+    def __init__(self):
+        self.units = [None for _ in range(4)]
+        self.units[UnitType.DAY] = BitSet(31) # 31桁のbit. 桁が日付に対応
+        self.units[UnitType.WDAY] = BitSet(7) # 7桁のbit. 桁が日付に対応
+        """
+        54桁のbit. date.isocalendar()のweekに準拠
+        https://docs.python.org/3/library/datetime.html#datetime.date.isocalendar
+        """
+        self.units[UnitType.WEEK] = BitSet(54)
+        self.units[UnitType.MONTH] = BitSet(12) # 12桁のbit. 桁が月に対応
+        self.year = None # ひとまずは年は範囲を持たないとする
+
+    def set(self, n, unit):
+        """
+        特定の単位 (year, month, week, wday, day) を特定の値にする
+
+        Arguments
+        ---------
+        n: int
+            指定したい値.
+        unit: UnitType
+            時間表現の単位. 年, 月, 週, 曜日, 日
+        """
+        if unit == UnitType.YEAR:
+            self.year = n
+            return
+        self.units[unit].set(n)
+
+    def set_by_datetime(self, d):
+        self.units[UnitType.DAY].set(d.day)
+        self.units[UnitType.WDAY].set(d.isoweekday())
+        self.units[UnitType.WEEK].set(d.isocalendar()[1])
+        self.units[UnitType.MONTH].set(d.month)
+        self.year = d.year
+
+    def add(self, n, unit):
+        """
+        特定の単位 (month, week, wday, day) に特定の値を追加する
+        現時点ではyearはサポートしない
+
+        Arguments
+        ---------
+        n: int
+            指定したい値.
+        unit: UnitType
+            時間表現の単位. 年, 月, 週, 曜日, 日
+        """
+        if unit == UnitType.YEAR:
+            raiseError("`unit` must not be `UnitType.YEAR`")
+        self.units[unit].add(n)
+
+    def shift(self, n, unit):
+        """
+        特定の単位 (month, week, wday, day) を特定の値だけずらす
+
+        Arguments
+        ---------
+        n: int
+            指定したい値.
+        unit: UnitType
+            時間表現の単位. 年, 月, 週, 曜日, 日
+        """
+        if unit == UnitType.YEAR:
+            self.year += n
+            return
+        self.units[unit].shift(n)
+
+    def freeze(self):
+        """
+        同じ値を持つFrozenDatetimeを返す
+        """
+        return FrozenDatetime(tuple(unit.freeze() for unit in self.units), self.year)
+
+
+class FrozenDatetime(_DatetimeBase):
+    """
+    変更できないDatetime. hashableなのでdictのkeyにでき, threadの間でcopyせずに共有できる
+
+    Arguments
+    ---------
+    units: tuple of FrozenBitSet
+        UnitType.DAY, WDAY, WEEK, MONTHの順に並べたもの
+    year: int or None
+    """
+    __slots__ = ("units", "year", "_hash")
+
+    def __init__(self, units, year=None):
+        assert len(units) == 4 and all(isinstance(unit, FrozenBitSet) for unit in units)
+        object.__setattr__(self, "units", tuple(units))
+        object.__setattr__(self, "year", year)
+        object.__setattr__(self, "_hash", hash((self.units, year)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenDatetime is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (FrozenDatetime, (self.units, self.year))
+
+    def thaw(self):
+        """
+        同じ値を持つ変更可能なDatetimeを返す
+        """
+        result = Datetime()
+        result.units = [unit.thaw() for unit in self.units]
+        result.year = self.year
+        return result
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" 表記ゆれや誤字を許容してtoken列に変換する
+例: ゴールデンウイーク (辞書にはゴールデンウィーク)
+    -> [FuzzyToken(d_goldenweek, 0, 9, cost=1)]
+"""
+
+from str2date.lexer import Token, _resolve, _scan_numeral
+from str2date.trie import TokenTrie
+
+
+class FuzzyToken(Token):
+    """
+    fuzzy_lexerが返すtoken
+
+    Properties
+    ----------
+    cost: int
+        tokenの文字列と元のtextとの編集距離. 完全に一致した場合は0
+    """
+    __slots__ = ("cost",)
+
+    def __init__(self, token_id, start, end, cost=0):
+        super().__init__(token_id, start, end)
+        self.cost = cost
+
+    def __eq__(self, other):
+        if not isinstance(other, FuzzyToken):
+            return NotImplemented
+        return super().__eq__(other) and self.cost == other.cost
+
+    def __repr__(self):
+        return "FuzzyToken(%r, %d, %d, cost=%d)" % (self.token_id, self.start, self.end, self.cost)
+
+
+def fuzzy_lexer(text, tokens, disambiguation_map=None, max_edits=1, min_length=4):
+    """
+    lexerと同じくtextを先頭から読み込むが, 完全に一致するtokenより長い範囲に
+    編集距離max_edits以内で一致するtokenがあればそちらを使う.
+    短いtokenは編集を許すと無関係な文字列にも一致するので, 長さがmin_length以上のtokenに限る
+
+    Arguments
+    ---------
+    text: str
+    tokens: dict of {str: str}, TokenTrie, MappedTokens or LayeredTrie
+        dictの場合はTokenTrieにコンパイルして使う
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+    max_edits: int, optional
+        許容する編集距離
+    min_length: int, optional
+        編集を許容するtokenの長さの最小値
+
+    Returns
+    -------
+    result: list of FuzzyToken
+    """
+    if isinstance(tokens, dict):
+        tokens = TokenTrie(tokens)
+    if not hasattr(tokens, "fuzzy_matches"):
+        raise ValueError("%s does not support fuzzy matching" % type(tokens).__name__)
+    if disambiguation_map is None:
+        disambiguation_map = getattr(tokens, "disambiguation_map", None)
+    pos = 0
+    result = []
+    while pos < len(text):
+        numeral = _scan_numeral(text, pos)
+        if numeral is not None:
+            result.append(FuzzyToken(numeral[0], pos, numeral[1]))
+            pos = numeral[1]
+            continue
+
+        best = tokens.longest_match(text, pos)
+        cost = 0
+        if max_edits > 0:
+            for end, token_id, edits, length in tokens.fuzzy_matches(text, pos, max_edits):
+                if edits == 0 or length < min_length:
+                    continue
+                if best is None or (end, -edits) > (best[0], -cost):
+                    best = (end, token_id)
+                    cost = edits
+        if best is None:
+            pos += 1
+            continue
+        end, token_id = best
+        prev_c = text[pos-1] if pos > 0 else None
+        next_c = text[pos+1] if pos < len(text) - 1 else None
+        resolved = _resolve(text[pos:end], token_id, prev_c, next_c, disambiguation_map)
+        for resolved_id in resolved[:-1]:
+            result.append(FuzzyToken(resolved_id, pos, pos))
+        result.append(FuzzyToken(resolved[-1], pos, end, cost))
+        pos = end
+    return result
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" 辞書に一致する全てのtokenからlatticeを作り, コスト最小のtoken列を選ぶ
+最長一致で区切ると読み飛ばしが生じる入力や, あいまい性のあるtokenを
+前後のtokenとのつながりから解消したい場合に使う
+例: 辞書が {ab, a, bc} で入力が abc
+    最長一致: [ab] (cは読み飛ばし)
+    lattice: [a, bc]
+"""
+
+from str2date.lexer import Token, _scan_numeral, _wdays
+
+DEFAULT_TOKEN_COST = 1.0
+DEFAULT_SKIP_COST = 3.0
+# あいまい性のあるtokenを変換先のprefix毎に解釈するときに加えるコスト
+DEFAULT_AMBIGUOUS_COSTS = {"d_": 0.5}
+# 隣り合うtokenの種類の組に加えるコスト.
+# 種類は数値表現が"num", 一文字の曜日が"wday", それ以外はprefix ("s_", "o_"など)
+DEFAULT_CONNECTION_COSTS = {("num", "s_"): -0.5, ("wday", "wday"): -1.0}
+
+_MAX_LEN = 15
+
+
+def _prefix_matches(text, pos, tokens):
+    if not isinstance(tokens, dict):
+        return tokens.prefix_matches(text, pos)
+    matches = []
+    for end in range(pos + 1, min(len(text), pos + _MAX_LEN) + 1):
+        token_id = tokens.get(text[pos:end])
+        if token_id is not None:
+            matches.append((end, token_id))
+    return matches
+
+
+def _token_class(token_id, surface):
+    if isinstance(token_id, int):
+        return "num"
+    if token_id.startswith("d_") and surface in _wdays:
+        return "wday"
+    return token_id[:2]
+
+
+def lattice_lexer(text, tokens, disambiguation_map=None, token_costs=None,
+                  skip_cost=DEFAULT_SKIP_COST, ambiguous_costs=None,
+                  connection_costs=None, beam=4, spans=False):
+    """
+    textに一致する全てのtokenからなるlatticeを作り,
+    コストの和が最小となるtoken列をビタビアルゴリズムで求める.
+    位置毎に直前のtokenの種類が異なる状態をbeam個まで残すので,
+    計算量はtextの長さに対して線形
+
+    Arguments
+    ---------
+    text: str
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+        あいまい性のあるtokenの変換辞書. あいまい性のあるtokenは
+        変換先の全ての候補をlatticeに加え, 前後とのつながりで選ぶ
+    token_costs: dict of {str: float}, optional
+        正規化された表現毎のコスト. 含まれないものはDEFAULT_TOKEN_COST
+    skip_cost: float, optional
+        どのtokenにも一致しない文字を一文字読み飛ばすコスト
+    ambiguous_costs: dict of {str: float}, optional
+        あいまい性のあるtokenを変換先のprefix毎に解釈するときに加えるコスト
+    connection_costs: dict of {(str, str): float}, optional
+        隣り合うtokenの種類の組に加えるコスト
+    beam: int, optional
+        位置毎に残す状態の数の上限
+    spans: bool, optional
+        Trueならtokenの代わりにTokenのlistを返す
+
+    Returns
+    -------
+    result: list of str or list of Token
+        lexerと同じ形式のtokenのlist
+    """
+    assert beam > 0
+    if disambiguation_map is None:
+        disambiguation_map = getattr(tokens, "disambiguation_map", None)
+    token_costs = {} if token_costs is None else token_costs
+    ambiguous_costs = DEFAULT_AMBIGUOUS_COSTS if ambiguous_costs is None else ambiguous_costs
+    connection_costs = DEFAULT_CONNECTION_COSTS if connection_costs is None else connection_costs
+
+    # states[pos]: {直前のtokenの種類: (コスト, 直前の状態の位置, 直前の状態の種類, 出力するToken)}
+    states = [dict() for _ in range(len(text) + 1)]
+    states[0]["BOS"] = (0.0, None, None, ())
+
+    for pos in range(len(text)):
+        if len(states[pos]) == 0:
+            continue
+        if len(states[pos]) > beam:
+            kept = sorted(states[pos].items(), key=lambda x: x[1][0])[:beam]
+            states[pos] = dict(kept)
+
+        edges = []
+        numeral = _scan_numeral(text, pos)
+        if numeral is not None:
+            edges.append((numeral[1], numeral[0], "num", DEFAULT_TOKEN_COST))
+        else:
+            for end, token_id in reversed(_prefix_matches(text, pos, tokens)):
+                surface = text[pos:end]
+                if token_id.startswith("a_"):
+                    assert disambiguation_map is not None
+                    for prefix, candidates in disambiguation_map.items():
+                        if token_id not in candidates:
+                            continue
+                        candidate = candidates[token_id]
+                        cost = token_costs.get(candidate, DEFAULT_TOKEN_COST) + ambiguous_costs.get(prefix, 0.0)
+                        edges.append((end, candidate, _token_class(candidate, surface), cost))
+                else:
+                    cost = token_costs.get(token_id, DEFAULT_TOKEN_COST)
+                    edges.append((end, token_id, _token_class(token_id, surface), cost))
+            edges.append((pos + 1, None, "skip", skip_cost))
+
+        for prev_cls, (prev_cost, _, _, _) in states[pos].items():
+            for end, token_id, cls, cost in edges:
+                emitted = ()
+                if token_id is not None:
+                    emitted = (Token(token_id, pos, end),)
+                    if cls == "wday" and prev_cls == "wday":
+                        # "土日"のように複数曜日の指定を行う表現は"土 or 日"と解釈し, orを追加する
+                        emitted = (Token("o_or", pos, pos),) + emitted
+                total = prev_cost + cost + connection_costs.get((prev_cls, cls), 0.0)
+                best = states[end].get(cls)
+                # コストが同じ場合は, 最長一致と同じく手前のtokenが長い方を選ぶ
+                if best is None or total < best[0] or (total == best[0] and pos > best[1]):
+                    states[end][cls] = (total, pos, prev_cls, emitted)
+
+    # 終端の状態から逆に辿る
+    pos = len(text)
+    cls = min(states[pos], key=lambda c: (states[pos][c][0], -states[pos][c][1]))
+    chunks = []
+    while pos > 0:
+        _, prev_pos, prev_cls, emitted = states[pos][cls]
+        chunks.append(emitted)
+        pos, cls = prev_pos, prev_cls
+    result = [token for emitted in reversed(chunks) for token in emitted]
+    if spans:
+        return result
+    return [token.token_id for token in result]
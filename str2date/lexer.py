@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import unicodedata
+import itertools
+import multiprocessing
+import os
+import re
+
+from str2date.normalize import normalize, normalize_with_offsets
+from str2date.trie import TokenTrie
 
 """ 日時操作表現をtoken列に変換する
 例: 次のゴールデンウィークの最終日
@@ -11,99 +17,423 @@ import unicodedata
 
 _wdays = set(["日", "月", "火", "水", "木", "金", "土"])
 
-def match(text, tokens):
+# 数値表現として扱う文字. \dは全角数字などunicodeの十進数字を含む
+_KANJI_DIGITS = str.maketrans("〇零一二三四五六七八九", "00123456789")
+_SMALL_UNITS = {"十": 10, "百": 100, "千": 1000}
+_LARGE_UNITS = {"万": 10**4, "億": 10**8, "兆": 10**12}
+_NUMERAL_CHARS = "\\d〇零一二三四五六七八九十百千万億兆"
+_NUMERAL_PATTERN = re.compile("[%s]+" % _NUMERAL_CHARS)
+
+
+class Token:
     """
-    textの文頭に一致するtokenを最長一致で探す
+    lexerが返すtokenと, 元のtext中での位置
+
+    Properties
+    ----------
+    token_id: str or int
+        正規化された表現. 数値表現の場合は数値
+    start: int
+        元のtext中でのtokenの開始位置
+    end: int
+        元のtext中でのtokenの終端位置.
+        "土日"の間に補完した"o_or"のように元のtextにないtokenはstart == end
+    """
+    __slots__ = ("token_id", "start", "end")
+
+    def __init__(self, token_id, start, end):
+        self.token_id = token_id
+        self.start = start
+        self.end = end
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.token_id, self.start, self.end) == (other.token_id, other.start, other.end)
+
+    def __repr__(self):
+        return "Token(%r, %d, %d)" % (self.token_id, self.start, self.end)
+
+
+def match(text, tokens, pos=0):
+    """
+    textのpos文字目から始まるtokenを最長一致で探す.
+    textのsliceは候補の長さ分しか作らない
 
     Arguments
     ---------
     text: str
-    tokens: map of {str: str}
-        tokenの文字列をkey, 正規化された表現をvalueにもつdict
+    tokens: map of {str: str} or TokenTrie
+        tokenの文字列をkey, 正規化された表現をvalueにもつdict,
+        もしくはそれをコンパイルしたTokenTrie
+    pos: int, optional
+        探索を開始する位置
 
     Returns
     -------
     token: str or None
         一致するtokenがあればそのtoken、なければNoneを返す
     """
+    if not isinstance(tokens, dict):
+        m = tokens.longest_match(text, pos)
+        return None if m is None else text[pos:m[0]]
     MAX_LEN = 15
-    target_len = min(MAX_LEN, len(text))
+    target_len = min(MAX_LEN, len(text) - pos)
     while target_len > 0:
-        target = text[:target_len]
+        target = text[pos:pos+target_len]
         if target in tokens:
             return target
         target_len -= 1
     return None
 
 
-def lexer(text, tokens, disambiguation_map=None):
+def _parse_kanji_numeral(run):
+    """
+    位取りの漢数字 (二千十八, 十二など) を含む数値表現を数値に変換する
+
+    Arguments
+    ---------
+    run: str
+        _NUMERAL_PATTERNに一致した文字列. 漢数字の数字はアラビア数字に変換済み
+
+    Returns
+    -------
+    number: int
+    """
+    total = 0   # 万, 億, 兆の位まで確定した値
+    section = 0 # 十, 百, 千の位まで確定した値
+    current = 0 # 位取りの前の数字の並び
+    for c in run:
+        if c in _SMALL_UNITS:
+            section += (current or 1) * _SMALL_UNITS[c]
+            current = 0
+        elif c in _LARGE_UNITS:
+            total += ((section + current) or 1) * _LARGE_UNITS[c]
+            section = 0
+            current = 0
+        else:
+            current = current * 10 + int(c)
+    return total + section + current
+
+
+def _scan_numeral(text, pos):
+    """
+    text[pos]から始まる数値表現を読み込む.
+    アラビア数字, 全角数字, 漢数字 (位取りを含む) を扱う
+
+    Returns
+    -------
+    numeral: (int, int) or None
+        数値と数値表現の終端位置. text[pos]が数値でなければNone
+    """
+    m = _NUMERAL_PATTERN.match(text, pos)
+    if m is None:
+        return None
+    run = m.group().translate(_KANJI_DIGITS)
+    if run.isdecimal():
+        # int()は全角数字なども含めて十進数字をそのまま扱える
+        return int(run), m.end()
+    return _parse_kanji_numeral(run), m.end()
+
+
+def _resolve(token, token_id, prev_c, next_c, disambiguation_map):
+    """
+    一致したtokenのあいまい性を解消し, 出力するtokenのlistを返す
+
+    Arguments
+    ---------
+    token: str
+        一致したtokenの文字列
+    token_id: str
+        tokenの正規化された表現
+    prev_c: str or None
+        tokenの直前の文字
+    next_c: str or None
+        tokenの先頭の次の文字
+    disambiguation_map: dict of {str: dict of {str: str}
+
+    Returns
+    -------
+    result: list of str
+    """
+    result = []
+    if token_id.startswith("a_"):
+        assert disambiguation_map is not None
+        # あいまい性のあるトークンのあいまい性の解消
+        # あいまい性のあるトークンは "日" (day or sunday), "月" (month or monday) の二種類
+        if prev_c in _wdays or next_c in _wdays:
+            # 日月, 土日, 月水金, のように複数曜日の表現の場合のみd_とみなす
+            token_id = disambiguation_map["d_"][token_id]
+        else:
+            token_id = disambiguation_map["s_"][token_id]
+    if token in _wdays and token_id.startswith("d_"):
+        # "土日"のように複数曜日の指定を行う表現は"土 or 日"と解釈し, orを追加する
+        if prev_c in _wdays:
+            result.append("o_or")
+    result.append(token_id)
+    return result
+
+
+def _lex_step(text, pos, tokens, disambiguation_map, result, spans):
+    """
+    text[pos]から一つ分の数値表現もしくはtokenを読み込み, resultに追加する
+
+    Returns
+    -------
+    end: int
+        次に読み込む位置
+    token_id: int, str or None
+        数値表現なら数値, tokenならあいまい性を解消する前の正規化された表現.
+        一致するものがなく一文字読み飛ばした場合はNone
+    """
+    # 数値表現を取得する
+    numeral = _scan_numeral(text, pos)
+    if numeral is not None:
+        result.append(Token(numeral[0], pos, numeral[1]) if spans else numeral[0])
+        return numeral[1], numeral[0]
+
+    # 数値以外の表現を取得する
+    if isinstance(tokens, dict):
+        token = match(text, tokens, pos)
+        token_id = None if token is None else tokens[token]
+    else:
+        m = tokens.longest_match(text, pos)
+        token = None if m is None else text[pos:m[0]]
+        token_id = None if m is None else m[1]
+    if token is None:
+        return pos + 1, None
+    prev_c = text[pos-1] if pos > 0 else None
+    next_c = text[pos+1] if pos < len(text) - 1 else None
+    resolved = _resolve(token, token_id, prev_c, next_c, disambiguation_map)
+    end = pos + len(token)
+    if spans:
+        for i, resolved_id in enumerate(resolved):
+            is_last = i == len(resolved) - 1
+            result.append(Token(resolved_id, pos, end if is_last else pos))
+    else:
+        result.extend(resolved)
+    return end, token_id
+
+
+def lexer(text, tokens, disambiguation_map=None, spans=False, normalized=False):
     """
     textを先頭から読み込み、tokens中で該当したtokenのlistを返す
 
     Arguments
     ---------
     text: str
-    tokens: dict of {str: str}
-        tokenの文字列をkey, 正規化された表現をvalueにもつdict
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+        tokenの文字列をkey, 正規化された表現をvalueにもつdict.
+        大量のtextを処理する場合はTokenTrieにコンパイルしたものを渡すと速い
     disambiguation_map: dict of {str: dict of {str: str}
         あいまい性のあるtokenの変換辞書
         変換先のtokenのprefixをkey, {変換元のtoken: 変換先のtoken} をvalueにもつ
         例: {"d_": {"a_moon": "d_monday"}, "s_": {"a_moon": "s_month"}}
+        Noneの場合, tokensがdisambiguation_mapを持っていればそれを使う
+    spans: bool, optional
+        Trueならtokenの代わりに元のtext中での位置を持つTokenのlistを返す
+    normalized: bool, optional
+        Trueならtextをnormalizeで揃えてから読み込む. Tokenの位置は元のtextの位置と一致する.
+        tokensもnormalize_tokensで揃えておくこと
 
     Returns
     -------
-    result: list of str
+    result: list of str or list of Token
         tokenのlistを返す
     """
+    offsets = None
+    if normalized and spans:
+        text, offsets = normalize_with_offsets(text)
+    elif normalized:
+        text = normalize(text)
+    if disambiguation_map is None:
+        disambiguation_map = getattr(tokens, "disambiguation_map", None)
     pos = 0
     result = []
     while pos < len(text):
-        c = text[pos]
-
-        # 数値表現を取得する
-        is_numeric = c.isnumeric()
-        token_number = 0
-        while c.isnumeric():
-            d = unicodedata.numeric(c)
-            token_number *= 10
-            token_number += d
-            pos += 1
-            if pos >= len(text):
-                break
-            c = text[pos]
-        if is_numeric:
-            result.append(int(token_number))
-            continue
-
-        # 数値以外の表現を取得する
-        partial = text[pos:]
-        token = match(partial, tokens)
-        if token is None:
-            pos += 1
-        else:
-            token_id = tokens[token]
-            if token_id.startswith("a_"):
-                assert disambiguation_map is not None
-                # あいまい性のあるトークンのあいまい性の解消
-                # あいまい性のあるトークンは "日" (day or sunday), "月" (month or monday) の二種類
-                prev_c = text[pos-1] if pos > 0 else None
-                next_c = text[pos+1] if pos < len(text) - 1 else None
-                if prev_c in _wdays or next_c in _wdays:
-                    # 日月, 土日, 月水金, のように複数曜日の表現の場合のみd_とみなす
-                    token_id = disambiguation_map["d_"][token_id]
-                else:
-                    token_id = disambiguation_map["s_"][token_id]
-            if token in _wdays and token_id.startswith("d_"):
-                # "土日"のように複数曜日の指定を行う表現は"土 or 日"と解釈し, orを追加する
-                prev_c = text[pos-1] if pos > 0 else None
-                if prev_c in _wdays:
-                    result.append("o_or")
-            result.append(token_id)
-            pos += len(token)
+        pos, _ = _lex_step(text, pos, tokens, disambiguation_map, result, spans)
+    if spans and offsets is not None:
+        # 揃えたtextの位置を元のtextの位置に戻す
+        result = [Token(t.token_id, offsets[t.start], offsets[t.end]) for t in result]
+    return result
+
+
+# lex_manyのworker processが保持する (tokens, disambiguation_map)
+_worker_dictionary = None
+
+
+def _init_worker(tokens, disambiguation_map):
+    global _worker_dictionary
+    _worker_dictionary = (tokens, disambiguation_map)
+
+
+def _lex_chunk(chunk, tokens, disambiguation_map):
+    """
+    chunk中のtextをlexerにかける. 同じtextはchunk内で一度だけ処理する
+    """
+    lexed = {}
+    result = []
+    for text in chunk:
+        tokens_of_text = lexed.get(text)
+        if tokens_of_text is None:
+            tokens_of_text = lexer(text, tokens, disambiguation_map)
+            lexed[text] = tokens_of_text
+        result.append(tokens_of_text)
     return result
 
 
+def _lex_chunk_in_worker(chunk):
+    tokens, disambiguation_map = _worker_dictionary
+    return _lex_chunk(chunk, tokens, disambiguation_map)
+
+
+def _chunks(texts, chunksize):
+    it = iter(texts)
+    while True:
+        chunk = list(itertools.islice(it, chunksize))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def lex_many(texts, tokens, disambiguation_map=None, workers=None, chunksize=1024):
+    """
+    複数のtextをprocess poolでlexerにかけ, 入力の順にtoken列を返す.
+    token辞書は各worker processの起動時に一度だけ渡す.
+    chunk内で同じtextが繰り返される場合は一度だけ処理する
+
+    Arguments
+    ---------
+    texts: iterable of str
+    tokens: dict of {str: str} or TokenTrie
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+    workers: int or None, optional
+        worker processの数. Noneの場合はCPU数. 1の場合はprocessを起動しない
+    chunksize: int, optional
+        一度にworkerに渡すtextの数
+
+    Returns
+    -------
+    result: iterator of list of str
+        textsと同じ順のtokenのlist
+    """
+    assert chunksize > 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunks(texts, chunksize)
+    if workers == 1:
+        for chunk in chunks:
+            for tokens_of_text in _lex_chunk(chunk, tokens, disambiguation_map):
+                yield list(tokens_of_text)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(tokens, disambiguation_map)) as pool:
+        for lexed in pool.imap(_lex_chunk_in_worker, chunks):
+            for tokens_of_text in lexed:
+                # chunk内で重複したtextは同じlistを共有しているので複製して返す
+                yield list(tokens_of_text)
+
+
+class IncrementalLexer:
+    """
+    末尾に文字が追加されていくtext (入力中の文字列など) を逐次lexerにかける.
+    追加された文字によって結果が変わり得る末尾の部分だけを読み直すので,
+    毎回textの全体をlexerにかけるのと同じ結果をより少ない手間で返す.
+
+    結果が変わり得るのは次の箇所
+    - textの末尾まで続く数値表現
+    - textの末尾までがより長いtokenの先頭と一致している箇所
+    - 次の文字で解釈の変わるあいまい性のあるtoken ("a_") がtextの末尾にある箇所
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+        dictの場合はTokenTrieにコンパイルして使う
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+    spans: bool, optional
+        Trueならtokenの代わりにTokenのlistを返す
+    """
+
+    def __init__(self, tokens, disambiguation_map=None, spans=False):
+        if isinstance(tokens, dict):
+            tokens = TokenTrie(tokens)
+        if disambiguation_map is None:
+            disambiguation_map = getattr(tokens, "disambiguation_map", None)
+        self.tokens = tokens
+        self.disambiguation_map = disambiguation_map
+        self.spans = spans
+        self.reset()
+
+    def reset(self):
+        """
+        空のtextの状態に戻す
+        """
+        self.text = ""
+        self._result = []
+        self._steps = [] # 読み込みを開始した位置と, その時点のresultの長さ
+        self._stable = 0 # _steps[:_stable]は今後文字が追加されても結果が変わらない
+
+    def append(self, chars):
+        """
+        textの末尾にcharsを追加し, text全体をlexerにかけた結果を返す
+
+        Arguments
+        ---------
+        chars: str
+
+        Returns
+        -------
+        result: list of str or list of Token
+        """
+        pos = len(self.text)
+        self.text += chars
+        if self._stable < len(self._steps):
+            pos, n_result = self._steps[self._stable]
+            del self._steps[self._stable:]
+            del self._result[n_result:]
+        self._lex_from(pos)
+        return self.result()
+
+    def result(self):
+        """
+        現在のtext全体をlexerにかけた結果を返す
+        """
+        return list(self._result)
+
+    def _lex_from(self, pos):
+        text = self.text
+        while pos < len(text):
+            self._steps.append((pos, len(self._result)))
+            end, token_id = _lex_step(text, pos, self.tokens, self.disambiguation_map,
+                                      self._result, self.spans)
+            if self._stable == len(self._steps) - 1 and not self._is_unstable(pos, end, token_id):
+                self._stable += 1
+            pos = end
+
+    def _is_unstable(self, pos, end, token_id):
+        """ text[pos:end]の読み込み結果が, 末尾に文字が追加されると変わり得ればTrue """
+        text = self.text
+        if isinstance(token_id, int):
+            return end == len(text)
+        if self.tokens.extends(text, pos):
+            return True
+        return token_id is not None and token_id.startswith("a_") and pos + 1 >= len(text)
+
+
 def load_tokens(fp):
+    """
+    tab区切りのtoken辞書を読み込む.
+    TokenTrie(load_tokens(fp)) とすればコンパイルした辞書が得られる
+
+    Arguments
+    ---------
+    fp: file object
+        "tokenの文字列\t正規化された表現" が一行ずつ並んだファイル
+
+    Returns
+    -------
+    tokens: dict of {str: str}
+    """
     tokens = {}
     for line in fp:
         token, normalized = line.rstrip().split('\t')
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" lexerにかける前に表記を揃える
+例: ２０２０年１２月～ｺﾞｰﾙﾃﾞﾝｳｨｰｸ
+    -> 2020年12月〜ゴールデンウィーク
+
+濁点, 半濁点は直前のカタカナと合成して一文字にするので, 変換後のtextは元のtextより短くなり得る.
+元のtextでの位置が必要な場合はnormalize_with_offsetsを使う
+"""
+
+import re
+import unicodedata
+
+# 半角の濁点, 半濁点を変換した結合文字
+_VOICED_MARK = "゙"
+_SEMI_VOICED_MARK = "゚"
+
+
+def _build_table():
+    table = {}
+    # 全角英数字, 記号 -> 半角
+    for code in range(0xff01, 0xff5f):
+        table[code] = chr(code - 0xfee0)
+    table[0x3000] = " "
+    # 半角カタカナ -> 全角
+    for code in range(0xff61, 0xffa0):
+        normalized = unicodedata.normalize("NFKC", chr(code))
+        assert len(normalized) == 1
+        table[code] = normalized
+    # 濁点, 半濁点は一旦結合文字にし, 直前の文字と合成する
+    table[0xff9e] = _VOICED_MARK
+    table[0xff9f] = _SEMI_VOICED_MARK
+    # 波ダッシュの異体字
+    for c in "～∼~":
+        table[ord(c)] = "〜"
+    table[ord("ヵ")] = "ヶ"
+    return table
+
+
+def _build_compositions():
+    """ (カタカナ, 結合文字) -> 合成した文字 """
+    compositions = {}
+    for code in range(0x30a1, 0x30ff):
+        for mark in (_VOICED_MARK, _SEMI_VOICED_MARK):
+            composed = unicodedata.normalize("NFC", chr(code) + mark)
+            if len(composed) == 1:
+                compositions[chr(code) + mark] = composed
+    return compositions
+
+_TABLE = _build_table()
+_COMPOSITIONS = _build_compositions()
+# 合成できなかった結合文字は全角の濁点, 半濁点にする
+_SPACING_MARKS = {_VOICED_MARK: "゛", _SEMI_VOICED_MARK: "゜"}
+_MARK_PATTERN = re.compile("[%s%s]" % (_VOICED_MARK, _SEMI_VOICED_MARK))
+
+
+def normalize_with_offsets(text):
+    """
+    normalizeと同じ変換をし, 変換後の各位置に対応する元のtextの位置も返す
+
+    Arguments
+    ---------
+    text: str
+
+    Returns
+    -------
+    normalized: str
+    offsets: list of int or None
+        長さlen(normalized)+1のlist. offsets[i]はnormalized[i]に対応するtextの位置.
+        offsets[len(normalized)]はlen(text).
+        濁点, 半濁点がなく変換前後で位置が変わらない場合はNone
+    """
+    translated = text.translate(_TABLE)
+    if _MARK_PATTERN.search(translated) is None:
+        return translated, None
+    offsets = []
+    normalized = _compose(translated, offsets)
+    offsets.append(len(text))
+    return normalized, offsets
+
+
+def _compose(translated, offsets=None):
+    """
+    結合文字にした濁点, 半濁点を直前の文字と合成する.
+    offsetsを渡した場合は, 残した各文字のtranslatedでの位置を追加する
+    """
+    chars = []
+    for i, c in enumerate(translated):
+        if c in _SPACING_MARKS:
+            if len(chars) > 0 and chars[-1] + c in _COMPOSITIONS:
+                chars[-1] = _COMPOSITIONS[chars[-1] + c]
+                continue
+            c = _SPACING_MARKS[c]
+        chars.append(c)
+        if offsets is not None:
+            offsets.append(i)
+    return "".join(chars)
+
+
+def normalize(text):
+    """
+    全角英数字を半角に, 半角カタカナを全角に, 波ダッシュの異体字を一つに揃える.
+    半角の濁点, 半濁点は直前のカタカナと合成する (ｺﾞ -> ゴ)
+
+    Arguments
+    ---------
+    text: str
+
+    Returns
+    -------
+    normalized: str
+    """
+    translated = text.translate(_TABLE)
+    if _MARK_PATTERN.search(translated) is None:
+        return translated
+    return _compose(translated)
+
+
+def normalize_tokens(tokens):
+    """
+    token辞書のtokenの文字列をnormalizeで揃える.
+    normalizeしたtextをlexerにかける場合は, 辞書もこれで揃えておく
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}
+
+    Returns
+    -------
+    normalized: dict of {str: str}
+    """
+    return {normalize(token): normalized for token, normalized in tokens.items()}
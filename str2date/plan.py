@@ -0,0 +1,573 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" token列を中間言語のplanに変換し, 基準日に対して評価する
+例: 来週の土日
+    -> [o_next, s_week, d_saturday, o_or, d_sunday]
+    -> x0 = now
+       x1 = shift(x0, week=+1)
+       x2 = wday(x1, {土, 日})
+
+tokenの結合 (memo.md)
+    num + s -> d: 2020, s_year -> set(year=2020)
+    o + s -> o: o_next, s_week -> shift(week=+1)
+    o + d -> d: o_next, d_tuesday -> next(wday={火})
+曜日の並びは操車場アルゴリズムで解釈する. o_orは二項演算子,
+"n回目" (num + s_times) と "次の" (o_next) は曜日に前置される単項演算子で, o_orより弱く結合する
+
+token列中の数値は引数 (Param) として扱い, 数値だけが異なるtoken列は同じtemplateを共有する
+例: 12月の2回目の火曜日 と 11月の3回目の火曜日
+    -> [#0, s_month, #1, s_times, d_tuesday]
+"""
+
+from collections import namedtuple
+from datetime import MAXYEAR, MINYEAR, datetime
+import threading
+
+from str2date.cache import LRUCache
+import str2date.dateutil as dateutil
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# op: 命令の種類, unit: 時間表現の単位, arg: 引数
+Instr = namedtuple("Instr", ["op", "unit", "arg"])
+# templateの命令の引数で, token列中のindex番目の数値にoffsetを足した値
+Param = namedtuple("Param", ["index", "offset"])
+# ops: Paramを含む命令のtuple, n_params: 引数の数
+Template = namedtuple("Template", ["ops", "n_params"])
+# template: 共有するtemplate, params: 引数の値, ops: 引数を束縛した命令のtuple,
+# folded: 基準日に依存しない場合に前もって評価した日付のordinalのtuple. 依存すればNone
+Plan = namedtuple("Plan", ["template", "params", "ops", "folded"])
+
+# 全てのplanで共有するtemplateのcache. 数値を除いたtoken列をkeyにする
+template_cache = LRUCache(maxsize=1024)
+# 引数を束縛したplanのcache. templateのkeyと引数の組をkeyにする
+plan_cache = LRUCache(maxsize=4096)
+
+# templateのcacheのkeyで数値の代わりに置く値
+_NUMBER = "#"
+
+_UNITS = {"s_year": "year", "s_month": "month", "s_week": "week", "s_day": "day"}
+_SHIFTS = {"o_next": 1, "o_prev": -1, "o_this": 0}
+_RELATIVE_DAYS = {"d_today": 0, "d_tomorrow": 1, "d_yesterday": -1, "o_yesterday": -1}
+_WDAYS = {
+    "d_monday": 1, "d_tuesday": 2, "d_wednesday": 3, "d_thursday": 4, "d_thirsday": 4,
+    "d_friday": 5, "d_saturday": 6, "d_sunday": 7,
+}
+# 和暦の元年の前年
+_ERAS = {"p_meiji": 1867, "p_taisho": 1911, "p_showa": 1925, "p_heisei": 1988,
+         "p_reiwa": 2018, "p_ad": 0}
+
+# 操車場アルゴリズムの演算子の優先順位
+_PRECEDENCE = {"or": 2, "nth": 1, "next": 1}
+
+
+def _combine(tokens):
+    """
+    隣り合うtokenを結合し, 命令と曜日の式の要素の列に変換する
+
+    Returns
+    -------
+    items: list of tuple
+        ("instr", Instr), ("wday", int), ("or", None), ("nth", int), ("next", None) のいずれか
+    """
+    items = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        token = tokens[i]
+        following = tokens[i+1] if i + 1 < n else None
+        if token in _ERAS and isinstance(following, Param) and i + 2 < n and tokens[i+2] == "s_year":
+            param = Param(following.index, following.offset + _ERAS[token])
+            items.append(("instr", Instr("set", "year", param)))
+            i += 3
+        elif isinstance(token, Param) and following == "s_week":
+            # "n週"は何年の第n週かが決まらないので扱わない
+            raise ValueError("unsupported token: %r" % (following,))
+        elif isinstance(token, Param) and following in _UNITS:
+            items.append(("instr", Instr("set", _UNITS[following], token)))
+            i += 2
+        elif isinstance(token, Param) and following == "s_times":
+            items.append(("nth", token))
+            i += 2
+        elif token in _SHIFTS and following in _UNITS:
+            items.append(("instr", Instr("shift", _UNITS[following], _SHIFTS[token])))
+            i += 2
+        elif token in ("o_last", "o_first") and following == "s_day":
+            items.append(("instr", Instr(token[2:], "day", None)))
+            i += 2
+        elif token == "o_next" and following in _WDAYS:
+            items.append(("next", None))
+            i += 1
+        elif token in _RELATIVE_DAYS:
+            items.append(("instr", Instr("shift", "day", _RELATIVE_DAYS[token])))
+            i += 1
+        elif token == "d_monthend":
+            items.append(("instr", Instr("last", "day", None)))
+            i += 1
+        elif token in _WDAYS:
+            items.append(("wday", _WDAYS[token]))
+            i += 1
+        elif token == "o_or":
+            items.append(("or", None))
+            i += 1
+        else:
+            raise ValueError("unsupported token: %r" % (token,))
+    return items
+
+
+def _emit(rpn, ops):
+    """ 逆ポーランド記法の曜日の式を命令に変換してopsに追加する """
+    stack = []
+    for kind, arg in rpn:
+        if kind == "wday":
+            stack.append((frozenset([arg]), ()))
+        elif kind == "or":
+            if len(stack) < 2:
+                raise ValueError("o_or needs weekdays on both sides")
+            right = stack.pop()
+            left = stack.pop()
+            stack.append((left[0] | right[0], left[1] + right[1]))
+        else:
+            if len(stack) < 1:
+                raise ValueError("%s needs a weekday" % kind)
+            wdays, post = stack.pop()
+            stack.append((wdays, post + ((kind, arg),)))
+    for wdays, post in stack:
+        if any(kind == "next" for kind, _ in post):
+            ops.append(Instr("next", "wday", wdays))
+        else:
+            if any(kind == "nth" for kind, _ in post):
+                # "n回目"は一日ではなく月の中で数える
+                ops.append(Instr("scope", "month", None))
+            ops.append(Instr("filter", "wday", wdays))
+        for kind, arg in post:
+            if kind == "nth":
+                ops.append(Instr("nth", "day", arg))
+
+
+def _compile(tokens):
+    """
+    token列をtemplateに変換する. 数値は出現順にParamに置き換える
+    """
+    lifted = []
+    n_params = 0
+    for token in tokens:
+        if isinstance(token, int):
+            token = Param(n_params, 0)
+            n_params += 1
+        lifted.append(token)
+    ops = []
+    output = []
+    operators = []
+    for kind, arg in _combine(lifted) + [("instr", None)]:
+        if kind == "instr":
+            # 命令の前で曜日の式は終わる
+            while len(operators) > 0:
+                output.append(operators.pop())
+            _emit(output, ops)
+            output = []
+            if arg is not None:
+                ops.append(arg)
+        elif kind == "wday":
+            output.append((kind, arg))
+        elif kind == "or":
+            while len(operators) > 0 and _PRECEDENCE[operators[-1][0]] >= _PRECEDENCE[kind]:
+                output.append(operators.pop())
+            operators.append((kind, arg))
+        else:
+            # 前置の単項演算子
+            operators.append((kind, arg))
+    return Template(tuple(ops), n_params)
+
+
+def bind(template, params):
+    """
+    templateの引数に値を束縛したplanを返す
+
+    Arguments
+    ---------
+    template: Template
+    params: tuple of int
+        token列中の数値を出現順に並べたもの
+
+    Returns
+    -------
+    plan: Plan
+    """
+    assert len(params) == template.n_params
+    ops = []
+    for instr in template.ops:
+        if isinstance(instr.arg, Param):
+            instr = Instr(instr.op, instr.unit, params[instr.arg.index] + instr.arg.offset)
+        ops.append(instr)
+    return Plan(template, params, tuple(ops), _fold(ops))
+
+
+def compile_plan(tokens):
+    """
+    lexerが返したtoken列をplanに変換する.
+    数値を除いたtoken列が同じであればtemplate_cacheのtemplateを使い回し,
+    数値を束縛するだけで済ませる. 束縛したplanもplan_cacheに保持する
+
+    Arguments
+    ---------
+    tokens: list of str or int
+
+    Returns
+    -------
+    plan: Plan
+        変更できないplan. hashableなのでdictのkeyにできる
+    """
+    params = tuple(token for token in tokens if isinstance(token, int))
+    key = tuple(_NUMBER if isinstance(token, int) else token for token in tokens)
+    plan = plan_cache.get((key, params))
+    if plan is not None:
+        return plan
+    template = template_cache.get(key)
+    if template is None:
+        template = _compile(tokens)
+        template_cache.put(key, template)
+    plan = bind(template, params)
+    plan_cache.put((key, params), plan)
+    return plan
+
+
+# 評価中の状態は (lo, hi, unit, sel) のtuple.
+# lo, hi: 対象の期間の最初と最後の日のordinal (0001/1/1が1)
+# unit: 期間の単位. "day", "week", "month", "year".
+#       "now"は評価を始める前の基準日の一日で, 命令で選んだ一日 ("day") と区別する
+# sel: 期間中の選ばれた日のordinalのtuple. Noneなら期間中の全ての日
+_EMPTY = (1, 0, "day", ())
+
+
+def _wday(ordinal):
+    " ordinal -> 曜日 (月曜日が1, 日曜日が7) "
+    return (ordinal - 1) % 7 + 1
+
+
+def _month_span(ordinal, offset=0):
+    y, m, _ = dateutil._ord2ymd(ordinal)
+    m += offset
+    y += (m - 1) // 12
+    m = (m - 1) % 12 + 1
+    first = dateutil._ymd2ord(y, m, 1)
+    return first, first + dateutil.days_in_month(y, m) - 1
+
+
+def _year_span(year):
+    if not MINYEAR <= year <= MAXYEAR:
+        raise ValueError("year out of range: %r" % (year,))
+    return dateutil._ymd2ord(year, 1, 1), dateutil._ymd2ord(year, 12, 31)
+
+
+def _selection(state):
+    lo, hi, _, sel = state
+    return tuple(range(lo, hi + 1)) if sel is None else sel
+
+
+def _pick(ordinal):
+    if ordinal is None:
+        return _EMPTY
+    return (ordinal, ordinal, "day", None)
+
+
+def _step(state, instr):
+    """ 状態stateに命令instrを適用した状態を返す """
+    lo, hi, unit, sel = state
+    op = instr.op
+    if state == _EMPTY:
+        # 該当する日がなくなった後は何を適用しても空のまま
+        return _EMPTY
+    if op == "set":
+        if instr.unit == "year":
+            return _year_span(instr.arg) + ("year", None)
+        y = dateutil._ord2ymd(lo)[0]
+        if instr.unit == "month":
+            if not 1 <= instr.arg <= 12:
+                raise ValueError("month out of range: %r" % (instr.arg,))
+            first = dateutil._ymd2ord(y, instr.arg, 1)
+            return (first, first + dateutil.days_in_month(y, instr.arg) - 1, "month", None)
+        if instr.unit == "day":
+            if unit == "year":
+                days = tuple(o for o in _selection(state) if dateutil._ord2ymd(o)[2] == instr.arg)
+                return (lo, hi, unit, days) if len(days) > 0 else _EMPTY
+            first, last = _month_span(lo)
+            day = first + instr.arg - 1
+            return _pick(day if first <= day <= last else None)
+    elif op == "shift":
+        k = instr.arg
+        if instr.unit == "day":
+            return _pick(lo + k)
+        if instr.unit == "week":
+            monday = lo - _wday(lo) + 1 + 7 * k
+            return (monday, monday + 6, "week", None)
+        if instr.unit == "month":
+            return _month_span(lo, k) + ("month", None)
+        if instr.unit == "year":
+            return _year_span(dateutil._ord2ymd(lo)[0] + k) + ("year", None)
+    elif op == "scope":
+        if unit == "now" or unit == "day":
+            return _month_span(lo) + ("month", None)
+        return state
+    elif op == "filter":
+        if unit == "now":
+            # 基準日に曜日を指定した場合はその日を含む週から選ぶ.
+            # 命令で選んだ一日の場合はその日の曜日が一致するかだけを見る
+            lo = lo - _wday(lo) + 1
+            hi = lo + 6
+            state = (lo, hi, "week", None)
+        days = tuple(o for o in _selection(state) if _wday(o) in instr.arg)
+        if len(days) == 0:
+            return _EMPTY
+        return (state[0], state[1], state[2], days)
+    elif op == "next":
+        # loより後で最初に曜日が一致する日
+        for delta in range(1, 8):
+            if _wday(lo + delta) in instr.arg:
+                return _pick(lo + delta)
+    elif op == "first" or op == "last":
+        if unit == "now" or unit == "day":
+            # 一日だけの期間に月初, 月末を指定した場合はその日を含む月から選ぶ
+            state = _month_span(lo) + ("month", None)
+        days = _selection(state)
+        if len(days) == 0:
+            return _pick(None)
+        return _pick(days[0] if op == "first" else days[-1])
+    elif op == "nth":
+        days = _selection(state)
+        return _pick(days[instr.arg - 1] if 0 < instr.arg <= len(days) else None)
+    raise ValueError("unsupported instruction: %r" % (instr,))
+
+
+def _fold(ops):
+    """
+    最初の命令が年の指定であれば, planは基準日に依存しないので前もって評価する.
+    年の指定より前に命令があると, 基準日によってはその時点で該当する日がなくなり
+    以降も空のままになるので評価しない
+
+    Returns
+    -------
+    folded: tuple of int or None
+        評価した日付のordinalのtuple. 基準日に依存する場合はNone
+    """
+    if len(ops) == 0 or ops[0].op != "set" or ops[0].unit != "year":
+        return None
+    try:
+        state = _year_span(ops[0].arg) + ("year", None)
+        for instr in ops[1:]:
+            state = _step(state, instr)
+    except ValueError:
+        # 範囲外の値などのエラーは, 年を指定しないplanと同じく評価時に送出する
+        return None
+    return _selection(state)
+
+
+def _evaluate_ordinal(plan, ordinal):
+    """ 基準日のordinalに対してplanを評価し, 日付のordinalのtupleを返す """
+    if plan.folded is not None:
+        return plan.folded
+    state = (ordinal, ordinal, "now", None)
+    for instr in plan.ops:
+        state = _step(state, instr)
+    return _selection(state)
+
+
+def evaluate(plan, now):
+    """
+    基準日nowに対してplanを評価する
+
+    Arguments
+    ---------
+    plan: Plan
+    now: datetime.date or datetime.datetime
+        基準日
+
+    Returns
+    -------
+    dates: list of datetime.datetime
+        planが表す日付のlist
+    """
+    ordinal = now.toordinal()
+    return [datetime(*dateutil._ord2ymd(o)) for o in _evaluate_ordinal(plan, ordinal)]
+
+
+# numpyのdatetime64の0日目 (1970/1/1) のordinal
+_EPOCH = 719163
+
+
+# 最初の命令で値を指定する単位 -> 評価結果が依存する基準日の単位
+_SET_DEPENDENCIES = {"year": None, "month": "year", "day": "month"}
+
+
+def _dependency(plan):
+    """
+    planの評価結果が基準日のどの単位に依存するかを返す.
+    最初の命令だけが基準日を参照するので, それで決まる
+
+    Returns
+    -------
+    unit: str or None
+        "year", "month", "week", "day" のいずれか. 基準日に依存しなければNone
+    """
+    if plan.folded is not None:
+        return None
+    if len(plan.ops) == 0:
+        return "day"
+    instr = plan.ops[0]
+    if instr.op == "set" and instr.unit in _SET_DEPENDENCIES:
+        return _SET_DEPENDENCIES[instr.unit]
+    if instr.op == "shift" and instr.unit in ("year", "month", "week", "day"):
+        return instr.unit
+    if instr.op == "filter":
+        return "week"
+    if instr.op == "first" or instr.op == "last" or instr.op == "scope":
+        return "month"
+    if instr.op == "next" or instr.op == "nth":
+        return "day"
+    raise ValueError("unsupported instruction: %r" % (instr,))
+
+
+def _span_key(ordinal, unit):
+    if unit is None:
+        return None
+    if unit == "day":
+        return ordinal
+    if unit == "week":
+        return (ordinal - 1) // 7
+    y, m, _ = dateutil._ord2ymd(ordinal)
+    return y if unit == "year" else (y, m)
+
+
+def _evaluate_many_numpy(plan, ordinals, unit):
+    if unit is None:
+        keys = numpy.zeros(len(ordinals), dtype=numpy.int64)
+    elif unit == "day":
+        keys = ordinals
+    elif unit == "week":
+        keys = (ordinals - 1) // 7
+    else:
+        days = (ordinals - _EPOCH).astype("datetime64[D]")
+        keys = days.astype("datetime64[M]" if unit == "month" else "datetime64[Y]").astype(numpy.int64)
+    _, index, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+    values = [_evaluate_ordinal(plan, int(o)) for o in ordinals[index]]
+    return [values[i] for i in inverse]
+
+
+def evaluate_many(plan, reference_dates):
+    """
+    多数の基準日に対してplanを評価する.
+    評価結果が同じになる基準日 (例えば"来月の月末"なら同じ月の基準日) をまとめ,
+    まとまり毎に一度だけ評価する. numpyがあれば基準日のまとめ方の計算をnumpyで行う
+
+    Arguments
+    ---------
+    plan: Plan
+    reference_dates: sequence of int, datetime.date or numpy.ndarray
+        基準日のordinal, 日付, またはnumpyの整数 (ordinal) やdatetime64の配列
+
+    Returns
+    -------
+    results: list of tuple of int
+        基準日毎の, planが表す日付のordinalのtuple.
+        同じまとまりの基準日は同じtupleを共有する
+    """
+    unit = _dependency(plan)
+    if numpy is not None:
+        array = numpy.asarray(reference_dates)
+        if array.ndim == 1 and array.dtype.kind in "iuM":
+            if array.dtype.kind == "M":
+                ordinals = array.astype("datetime64[D]").astype(numpy.int64) + _EPOCH
+            else:
+                ordinals = array.astype(numpy.int64)
+            return _evaluate_many_numpy(plan, ordinals, unit)
+
+    results = []
+    values = {}
+    for reference in reference_dates:
+        ordinal = reference if isinstance(reference, int) else reference.toordinal()
+        key = _span_key(ordinal, unit)
+        value = values.get(key)
+        if value is None:
+            value = _evaluate_ordinal(plan, ordinal)
+            values[key] = value
+        results.append(value)
+    return results
+
+
+class ResolutionCache:
+    """
+    planの評価結果のcache. (plan, 基準日のordinal) をkeyにする.
+    評価結果は基準日が変わらない限り同じなので, 最新の基準日の結果だけを保持し,
+    日付が変わったら前日までの結果をまとめて捨てる.
+    最新より前の基準日は評価するだけでcacheしない
+
+    Arguments
+    ---------
+    maxsize: int
+        一日に保持する結果の数の上限
+
+    Properties
+    ----------
+    day: int or None
+        保持している結果の基準日のordinal
+    rollovers: int
+        日付が変わった回数
+    expired: int
+        日付が変わったために捨てた結果の数
+    stale: int
+        最新より前の基準日のためにcacheしなかった評価の数
+    """
+
+    def __init__(self, maxsize=4096):
+        self.cache = LRUCache(maxsize)
+        self.day = None
+        self.rollovers = 0
+        self.expired = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def _rollover(self, ordinal):
+        with self._lock:
+            if self.day is not None and ordinal <= self.day:
+                return
+            if self.day is not None:
+                self.rollovers += 1
+                self.expired += len(self.cache)
+                self.cache.clear()
+            self.day = ordinal
+
+    def evaluate(self, plan, now):
+        """
+        evaluateと同じ. 結果は変更できないようにtupleで返す
+
+        Returns
+        -------
+        dates: tuple of datetime.datetime
+        """
+        ordinal = now.toordinal()
+        if self.day is None or ordinal > self.day:
+            self._rollover(ordinal)
+        if ordinal < self.day:
+            self.stale += 1
+            return tuple(evaluate(plan, now))
+        key = (plan, ordinal)
+        dates = self.cache.get(key)
+        if dates is None:
+            dates = tuple(evaluate(plan, now))
+            self.cache.put(key, dates)
+        return dates
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats: dict of {str: int}
+            hits, misses, evictions, size, rollovers, expired, stale
+        """
+        stats = self.cache.stats()
+        stats.update(rollovers=self.rollovers, expired=self.expired, stale=self.stale)
+        return stats
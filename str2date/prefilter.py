@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" 日時操作表現を含み得ないtextをlexerにかける前に除外する """
+
+import re
+
+from str2date.lexer import _NUMERAL_CHARS
+
+
+class Prefilter:
+    """
+    token辞書の先頭の文字と数値表現の文字から作った文字クラスでtextを一度だけ走査し,
+    どのtokenも数値表現も含まないtextを除外する.
+    除外したtextをlexerにかけると必ず空のlistが返る
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+
+    Properties
+    ----------
+    checked: int
+        判定したtextの数
+    rejected: int
+        除外したtextの数
+    """
+
+    def __init__(self, tokens):
+        first_chars = sorted(set(token[0] for token, _ in tokens.items()))
+        self._pattern = re.compile(
+            "[%s%s]" % (_NUMERAL_CHARS, "".join(re.escape(c) for c in first_chars)))
+        self.checked = 0
+        self.rejected = 0
+
+    def may_contain(self, text):
+        """
+        textが日時操作表現を含み得ればTrue, 含み得なければFalse
+
+        Arguments
+        ---------
+        text: str
+
+        Returns
+        -------
+        ret: bool
+        """
+        self.checked += 1
+        if self._pattern.search(text) is None:
+            self.rejected += 1
+            return False
+        return True
+
+    def filter(self, texts):
+        """
+        textsのうち日時操作表現を含み得るものだけを返す
+
+        Arguments
+        ---------
+        texts: iterable of str
+
+        Returns
+        -------
+        texts: iterator of str
+        """
+        return (text for text in texts if self.may_contain(text))
+
+    @property
+    def reject_rate(self):
+        """
+        判定したtextのうち除外したものの割合. まだ判定していなければ0
+        """
+        if self.checked == 0:
+            return 0.0
+        return self.rejected / self.checked
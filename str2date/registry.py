@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" ファイルを監視し, 更新されたtoken辞書を再起動なしに差し替える """
+
+from collections import namedtuple
+import os
+import threading
+
+from str2date.cache import Snapshot, dictionary_fingerprint
+from str2date.lexer import lexer, load_tokens
+from str2date.tokenfile import MAGIC, MappedTokens
+from str2date.trie import TokenTrie
+
+VersionedResult = namedtuple("VersionedResult", ["version", "fingerprint", "result"])
+
+
+def load_dictionary(path):
+    """
+    pathの辞書を読み込む. compile_tokensで書き出したファイルならmmapし,
+    そうでなければtab区切りのtoken辞書としてTokenTrieにコンパイルする
+
+    Returns
+    -------
+    tokens: TokenTrie or MappedTokens
+    """
+    with open(path, "rb") as fp:
+        is_compiled = fp.read(len(MAGIC)) == MAGIC
+    if is_compiled:
+        return MappedTokens(path)
+    with open(path, encoding="utf-8") as fp:
+        return TokenTrie(load_tokens(fp))
+
+
+class TokenRegistry:
+    """
+    ファイルから読み込んだtoken辞書を保持し, ファイルが更新されたら読み込み直して差し替える.
+    差し替えは参照の置き換え一回で行うので, 処理中のlexerは古い辞書のまま最後まで進む.
+    ファイルを更新する際は別名で書き出してからrenameすること
+
+    Arguments
+    ---------
+    path: str
+        token辞書のファイルのpath
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+        Noneの場合, 辞書がdisambiguation_mapを持っていればそれを使う
+    interval: float, optional
+        startで監視を始めた場合に, ファイルの更新を確認する間隔の秒数
+    loader: callable, optional
+        pathを受け取り辞書を返す関数. 省略時はload_dictionary
+
+    Properties
+    ----------
+    last_error: Exception or None
+        監視中の読み込みで起きた直近の例外. 失敗した場合は古い辞書を使い続ける
+    """
+
+    def __init__(self, path, disambiguation_map=None, interval=1.0, loader=None):
+        self.path = path
+        self.disambiguation_map = disambiguation_map
+        self.interval = interval
+        self.loader = load_dictionary if loader is None else loader
+        self.last_error = None
+        self._snapshot = None
+        self._stat = None
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.reload()
+
+    @property
+    def snapshot(self):
+        """
+        現在の辞書とそのversion
+        """
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def reload(self, force=False):
+        """
+        ファイルが更新されていれば読み込み直して差し替える
+
+        Arguments
+        ---------
+        force: bool, optional
+            Trueならファイルの更新の有無によらず読み込み直す
+
+        Returns
+        -------
+        reloaded: bool
+            差し替えた場合はTrue
+        """
+        with self._reload_lock:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if not force and stat == self._stat:
+                return False
+            tokens = self.loader(self.path)
+            disambiguation_map = self.disambiguation_map
+            if disambiguation_map is None:
+                disambiguation_map = getattr(tokens, "disambiguation_map", None)
+            version = 1 if self._snapshot is None else self._snapshot.version + 1
+            fingerprint = dictionary_fingerprint(tokens, disambiguation_map)
+            self._snapshot = Snapshot(version, fingerprint, tokens, disambiguation_map)
+            self._stat = stat
+            return True
+
+    def lexer(self, text, spans=False):
+        """
+        現在の辞書でtextをlexerにかける
+
+        Returns
+        -------
+        result: VersionedResult
+            使った辞書のversion, fingerprintとlexerの結果.
+            process間で共有するcacheのkeyにはfingerprintを使うこと
+        """
+        snapshot = self._snapshot
+        result = lexer(text, snapshot.tokens, snapshot.disambiguation_map, spans=spans)
+        return VersionedResult(snapshot.version, snapshot.fingerprint, result)
+
+    def start(self):
+        """
+        別threadでファイルの監視を始める
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        ファイルの監視を止める
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reload()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" 長い文書中から日時操作表現の候補となる範囲を抜き出す
+例: 会議は来週の火曜日に延期します
+    -> [(3, 9, [o_next, s_week, d_tuesday])]
+"""
+
+from collections import deque
+
+from str2date.lexer import _resolve, _scan_numeral
+
+
+class AhoCorasick:
+    """
+    token辞書から構築したAho-Corasickオートマトン.
+    textを一度走査するだけで, 全ての位置から始まる最長一致のtokenを求める.
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}, TokenTrie or MappedTokens
+        tokenの文字列をkey, 正規化された表現をvalueにもつdict,
+        もしくはitemsを持つコンパイル済みの辞書
+
+    Properties
+    ----------
+    disambiguation_map: dict of {str: dict of {str: str} or None
+        tokensが持っていたあいまい性のあるtokenの変換辞書
+    goto: list of dict of {str: int}
+        node毎の, 文字から子nodeの番号への遷移. 0番目のnodeが根
+    fail: list of int
+        node毎の失敗時の遷移先
+    outputs: list of tuple of (int, str)
+        node毎の, そのnodeで終わるtokenの長さと正規化された表現.
+        失敗時の遷移先で終わるtokenも含む
+    """
+
+    def __init__(self, tokens):
+        self.disambiguation_map = getattr(tokens, "disambiguation_map", None)
+        self.goto = [{}]
+        self.fail = [0]
+        own = [None]
+        for token, normalized in tokens.items():
+            node = 0
+            for c in token:
+                child = self.goto[node].get(c)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][c] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    own.append(None)
+                node = child
+            own[node] = (len(token), normalized)
+
+        # 幅優先で失敗時の遷移先と出力を求める
+        self.outputs = [()] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        for node in queue:
+            self.outputs[node] = (own[node],) if own[node] is not None else ()
+        while len(queue) > 0:
+            node = queue.popleft()
+            for c, child in self.goto[node].items():
+                f = self.fail[node]
+                while f != 0 and c not in self.goto[f]:
+                    f = self.fail[f]
+                f = self.goto[f].get(c, 0)
+                self.fail[child] = f
+                outputs = self.outputs[f]
+                if own[child] is not None:
+                    outputs = (own[child],) + outputs
+                self.outputs[child] = outputs
+                queue.append(child)
+
+    def longest_matches(self, text):
+        """
+        textの各位置から始まる最長一致のtokenを求める
+
+        Arguments
+        ---------
+        text: str
+
+        Returns
+        -------
+        matches: dict of {int: (int, str)}
+            tokenの開始位置をkey, tokenの終端位置と正規化された表現をvalueにもつdict
+        """
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        matches = {}
+        node = 0
+        for i, c in enumerate(text):
+            while node != 0 and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            end = i + 1
+            for length, normalized in outputs[node]:
+                start = end - length
+                m = matches.get(start)
+                if m is None or m[0] < end:
+                    matches[start] = (end, normalized)
+        return matches
+
+
+def scan(text, automaton, disambiguation_map=None, max_gap=1):
+    """
+    textから日時操作表現の候補となる範囲を全て抜き出す.
+    tokenと数値表現の並びを一つの範囲とし, 間に挟まる文字数がmax_gap以下
+    ("来週の火曜日"の"の"など) であれば同じ範囲につなげる
+
+    Arguments
+    ---------
+    text: str
+    automaton: AhoCorasick
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+        あいまい性のあるtokenの変換辞書. lexerと同じ形式.
+        Noneの場合, automatonの構築に使った辞書が持っていればそれを使う
+    max_gap: int, optional
+        同じ範囲とみなすtoken間の文字数の最大値
+
+    Returns
+    -------
+    spans: list of (int, int, list)
+        範囲の開始位置, 終端位置, lexerと同じ形式のtokenのlist
+    """
+    if disambiguation_map is None:
+        disambiguation_map = automaton.disambiguation_map
+    matches = automaton.longest_matches(text)
+    spans = []
+    start = end = None
+    result = []
+    pos = 0
+    while pos < len(text):
+        numeral = _scan_numeral(text, pos)
+        m = matches.get(pos)
+        if numeral is None and m is None:
+            pos += 1
+            continue
+        if end is not None and pos - end > max_gap:
+            spans.append((start, end, result))
+            start = end = None
+            result = []
+        if start is None:
+            start = pos
+        if numeral is not None:
+            result.append(numeral[0])
+            pos = numeral[1]
+        else:
+            token = text[pos:m[0]]
+            prev_c = text[pos-1] if pos > 0 else None
+            next_c = text[pos+1] if pos < len(text) - 1 else None
+            result.extend(_resolve(token, m[1], prev_c, next_c, disambiguation_map))
+            pos = m[0]
+        end = pos
+    if start is not None:
+        spans.append((start, end, result))
+    return spans
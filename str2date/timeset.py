@@ -12,6 +12,8 @@ class TimeSet(metaclass=ABCMeta):
     """
     特定の時間表現の単位での集合
     """
+    __slots__ = ()
+
     @abstractmethod
     def add(self, n):
         """
@@ -79,6 +81,39 @@ class TimeSet(metaclass=ABCMeta):
         """
         raise NotImplementedError()
 
+    def select(self, k):
+        """
+        集合の要素のうち小さい方からk番目のものを返す
+
+        Arguments
+        ---------
+        k: int
+            1以上の順位.
+
+        Returns
+        -------
+        s: int or None
+            k番目の要素. 要素の数がk未満ならNone
+        """
+        assert k >= 1
+        s = sorted(set(self.active()))
+        return s[k-1] if k <= len(s) else None
+
+    def rank(self, n):
+        """
+        集合の要素のうちnより小さいものの数を返す
+
+        Arguments
+        ---------
+        n: int
+
+        Returns
+        -------
+        r: int
+            nより小さい要素の数
+        """
+        return len(set(x for x in self.active() if x < n))
+
 
 class BitTimeSet(TimeSet):
     """ BitSetで時間表現の集合を管理 """
@@ -119,17 +154,29 @@ class BitTimeSet(TimeSet):
         self.timeset.shift(n, wrap=wrap)
 
     def active(self):
-        return self.timeset.get_nonzero_digits()
+        return self.timeset.active()
 
     def check(self, n):
         return self.timeset.check(n)
 
+    def select(self, k):
+        return self.timeset.select(k)
+
+    def rank(self, n):
+        return self.timeset.rank(n)
+
     def reset(self):
         self.timeset.reset()
 
     def remove(self, n):
         self.timeset.remove(n)
 
+    def freeze(self):
+        """
+        同じ要素を持つFrozenBitTimeSetを返す
+        """
+        return FrozenBitTimeSet(type(self), self.timeset.freeze())
+
 
 class DayTimeSet(BitTimeSet):
     """ 日付の集合 """
@@ -155,6 +202,84 @@ class MonthTimeSet(BitTimeSet):
         super().__init__(12)
 
 
+class FrozenBitTimeSet(TimeSet):
+    """
+    変更できないBitTimeSet. hashableなのでdictのkeyにでき, threadの間でcopyせずに共有できる.
+    要素を変更するadd, set, shift, set_all, reset, removeはTypeErrorを送出する
+
+    Arguments
+    ---------
+    kind: type
+        freeze元のBitTimeSetのclass. thawで同じclassに戻す
+    timeset: FrozenBitSet
+    """
+    __slots__ = ("kind", "timeset")
+
+    def __init__(self, kind, timeset):
+        assert issubclass(kind, BitTimeSet)
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "timeset", timeset)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenBitTimeSet is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenBitTimeSet):
+            return NotImplemented
+        return self.kind is other.kind and self.timeset == other.timeset
+
+    def __hash__(self):
+        return hash((self.kind, self.timeset))
+
+    def __reduce__(self):
+        return (FrozenBitTimeSet, (self.kind, self.timeset))
+
+    def add(self, n):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def set(self, n):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def shift(self, n, **kwargs):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def set_all(self):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def reset(self):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def remove(self, n):
+        raise TypeError("FrozenBitTimeSet is immutable")
+
+    def active(self):
+        return self.timeset.active()
+
+    def check(self, n):
+        return self.timeset.check(n)
+
+    def select(self, k):
+        return self.timeset.select(k)
+
+    def rank(self, n):
+        return self.timeset.rank(n)
+
+    def thaw(self):
+        """
+        同じ要素を持つ, freeze元と同じclassのBitTimeSetを返す
+        """
+        result = self.kind.__new__(self.kind)
+        result.timeset = self.timeset.thaw()
+        return result
+
+
+def _frozen(kind, digits):
+    timeset = kind()
+    for n in digits:
+        timeset.add(n)
+    return timeset.freeze()
+
+
 class IntTimeSet(TimeSet):
     """ intのlistで時間表現の集合を管理
 
@@ -221,3 +346,8 @@ class YearSet(IntTimeSet):
         super().__init__()
 
 
+# よく使う集合は一度だけ作って共有する
+WEEKDAYS = _frozen(WdayTimeSet, range(1, 6))
+WEEKEND = _frozen(WdayTimeSet, [6, 7])
+# MONTH_DAYS[n]: n日ある月の全ての日
+MONTH_DAYS = dict((n, _frozen(DayTimeSet, range(1, n + 1))) for n in range(28, 32))
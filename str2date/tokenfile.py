@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" token辞書をバイナリ形式にコンパイルし, mmapしてそのままlexerで使う
+
+ファイルの構成 (全てlittle endian)
+    header: magic, 形式のversion, token数, node数, 遷移数, 正規化された表現の数,
+            文字列領域のbyte数, disambiguation_mapのbyte数
+    nodes: node毎に (遷移の開始位置, 遷移の数, 正規化された表現の番号 or -1)
+    edges: 遷移毎に (文字のcode point, 遷移先のnode). node毎に文字の昇順に並ぶ
+    offsets: 正規化された表現毎の文字列領域中の開始位置 (終端として一つ多く持つ)
+    strings: 正規化された表現をutf-8で連結したもの
+    disambiguation_map: json
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+
+from str2date.trie import TokenTrie, fuzzy_walk
+
+MAGIC = b"S2DT"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sIIIIIII")
+_NODE = struct.Struct("<IIi")
+_EDGE = struct.Struct("<II")
+_OFFSET = struct.Struct("<I")
+
+
+def compile_tokens(tokens, path, disambiguation_map=None):
+    """
+    token辞書とdisambiguation_mapをバイナリ形式でpathに書き出す
+
+    Arguments
+    ---------
+    tokens: dict of {str: str} or TokenTrie
+    path: str
+        書き出すファイルのpath
+    disambiguation_map: dict of {str: dict of {str: str}, optional
+    """
+    trie = tokens if isinstance(tokens, TokenTrie) else TokenTrie(tokens)
+    value_index = {}
+    nodes = []
+    edges = []
+    for node, children in enumerate(trie.children):
+        value = trie.values[node]
+        if value is None:
+            index = -1
+        else:
+            index = value_index.setdefault(value, len(value_index))
+        nodes.append((len(edges), len(children), index))
+        for c, child in sorted(children.items()):
+            edges.append((ord(c), child))
+
+    strings = []
+    offsets = [0]
+    for value in sorted(value_index, key=value_index.get):
+        encoded = value.encode("utf-8")
+        strings.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+    dmap = json.dumps(disambiguation_map, ensure_ascii=False).encode("utf-8")
+
+    with open(path, "wb") as fp:
+        fp.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(trie), len(nodes), len(edges),
+                              len(value_index), offsets[-1], len(dmap)))
+        for node in nodes:
+            fp.write(_NODE.pack(*node))
+        for edge in edges:
+            fp.write(_EDGE.pack(*edge))
+        for offset in offsets:
+            fp.write(_OFFSET.pack(offset))
+        fp.write(b"".join(strings))
+        fp.write(dmap)
+
+
+class MappedTokens:
+    """
+    compile_tokensで書き出したファイルをmmapしたtoken辞書.
+    読み込み時に辞書を構築しないので起動が速く, forkしたprocess間でpageを共有する.
+    TokenTrieと同じくlexerにdictの代わりに渡せる
+
+    Arguments
+    ---------
+    path: str
+        compile_tokensで書き出したファイルのpath
+
+    Properties
+    ----------
+    disambiguation_map: dict of {str: dict of {str: str} or None
+        ファイルに一緒に書き出したあいまい性のあるtokenの変換辞書
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fp:
+            self._buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.size, n_nodes, n_edges, n_values,
+         strings_size, dmap_size) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            self._buf.close()
+            raise ValueError("%s is not a compiled token file" % path)
+        if version != FORMAT_VERSION:
+            self._buf.close()
+            raise ValueError("unsupported token file version: %d" % version)
+        self._nodes_at = _HEADER.size
+        self._edges_at = self._nodes_at + n_nodes * _NODE.size
+        self._offsets_at = self._edges_at + n_edges * _EDGE.size
+        self._strings_at = self._offsets_at + (n_values + 1) * _OFFSET.size
+        dmap_at = self._strings_at + strings_size
+        self.disambiguation_map = json.loads(
+            self._buf[dmap_at:dmap_at+dmap_size].decode("utf-8"))
+        self._values = {}
+        self._fingerprint = None
+        self._max_len = None
+
+    @property
+    def fingerprint(self):
+        """
+        ファイルの内容を表すhash. disambiguation_mapも含む
+        """
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha1(self._buf).hexdigest()
+        return self._fingerprint
+
+    def __reduce__(self):
+        # mmapはpickleできないので, 別processではファイルをmmapし直す
+        return (MappedTokens, (self.path,))
+
+    def close(self):
+        self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _node(self, node):
+        return _NODE.unpack_from(self._buf, self._nodes_at + node * _NODE.size)
+
+    def _child(self, node, c):
+        """ nodeから文字cで遷移した先のnode. なければNone """
+        start, count, _ = self._node(node)
+        return self._edge(start, count, c)
+
+    def _edge(self, start, count, c):
+        """ 遷移の範囲[start, start+count)から文字cの遷移先のnodeを二分探索する. なければNone """
+        code = ord(c)
+        lo = start
+        hi = start + count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            edge_code, child = _EDGE.unpack_from(self._buf, self._edges_at + mid * _EDGE.size)
+            if edge_code == code:
+                return child
+            if edge_code < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _value(self, index):
+        value = self._values.get(index)
+        if value is None:
+            at = self._offsets_at + index * _OFFSET.size
+            start, = _OFFSET.unpack_from(self._buf, at)
+            end, = _OFFSET.unpack_from(self._buf, at + _OFFSET.size)
+            value = self._buf[self._strings_at+start:self._strings_at+end].decode("utf-8")
+            self._values[index] = value
+        return value
+
+    def _find(self, token):
+        return self._find_from(token, 0)
+
+    def _find_from(self, text, pos):
+        """ text[pos:]で辿り着いたnodeの (遷移の開始位置, 遷移の数, 正規化された表現の番号). なければNone """
+        start, count, index = self._node(0)
+        for i in range(pos, len(text)):
+            node = self._edge(start, count, text[i])
+            if node is None:
+                return None
+            start, count, index = self._node(node)
+        return start, count, index
+
+    def prefix_matches(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを短い順に全て返す. TokenTrie.prefix_matchesと同じ
+        """
+        matches = []
+        start, count, _ = self._node(0)
+        for i in range(pos, len(text)):
+            node = self._edge(start, count, text[i])
+            if node is None:
+                break
+            start, count, index = self._node(node)
+            if index >= 0:
+                matches.append((i + 1, self._value(index)))
+        return matches
+
+    def longest_match(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを最長一致で探す. TokenTrie.longest_matchと同じ
+        """
+        # 一致した位置と番号だけを覚えておき, 最後に一度だけ文字列にする
+        last = None
+        start, count, _ = self._node(0)
+        for i in range(pos, len(text)):
+            node = self._edge(start, count, text[i])
+            if node is None:
+                break
+            start, count, index = self._node(node)
+            if index >= 0:
+                last = (i + 1, index)
+        return None if last is None else (last[0], self._value(last[1]))
+
+    def _children(self, node):
+        start, count, _ = self._node(node)
+        for i in range(start, start + count):
+            code, child = _EDGE.unpack_from(self._buf, self._edges_at + i * _EDGE.size)
+            yield chr(code), child
+
+    def _node_value(self, node):
+        index = self._node(node)[2]
+        return self._value(index) if index >= 0 else None
+
+    @property
+    def max_len(self):
+        """
+        最も長いtokenの長さ. 最初に参照したときにtrieを辿って求める
+        """
+        if self._max_len is None:
+            max_len = 0
+            stack = [(0, 0)]
+            while len(stack) > 0:
+                node, depth = stack.pop()
+                max_len = max(max_len, depth)
+                for _, child in self._children(node):
+                    stack.append((child, depth + 1))
+            self._max_len = max_len
+        return self._max_len
+
+    def fuzzy_matches(self, text, pos, max_edits):
+        """
+        text[pos:]の先頭と編集距離max_edits以内で一致するtokenを全て返す. TokenTrie.fuzzy_matchesと同じ
+        """
+        return [match[1:] for match in self.fuzzy_token_matches(text, pos, max_edits)]
+
+    def fuzzy_token_matches(self, text, pos, max_edits):
+        """
+        fuzzy_matchesと同じだが, 各要素の先頭に一致したtokenの文字列を加えて返す
+        """
+        return fuzzy_walk(text, pos, max_edits, self.max_len,
+                          self._child, self._children, self._node_value)
+
+    def extends(self, text, pos=0):
+        """
+        text[pos:]がより長いtokenの先頭と一致していればTrue. TokenTrie.extendsと同じ
+        """
+        record = self._find_from(text, pos)
+        return record is not None and record[1] > 0
+
+    def items(self):
+        """
+        (tokenの文字列, 正規化された表現) のlistを返す
+        """
+        result = []
+        stack = [(0, "")]
+        while len(stack) > 0:
+            node, prefix = stack.pop()
+            index = self._node(node)[2]
+            if index >= 0:
+                result.append((prefix, self._value(index)))
+            for c, child in self._children(node):
+                stack.append((child, prefix + c))
+        return result
+
+    def __getitem__(self, token):
+        record = self._find(token)
+        if record is None or record[2] < 0:
+            raise KeyError(token)
+        return self._value(record[2])
+
+    def __contains__(self, token):
+        record = self._find(token)
+        return record is not None and record[2] >= 0
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+""" token辞書をtrieにコンパイルし, 最長一致を一回の走査で求める """
+
+import hashlib
+
+
+def items_fingerprint(items):
+    """
+    (tokenの文字列, 正規化された表現) の並びから辞書の内容を表すhashを求める.
+    並び順には依存せず, process間でも同じ値になる
+
+    Arguments
+    ---------
+    items: iterable of (str, str)
+
+    Returns
+    -------
+    fingerprint: str
+    """
+    h = hashlib.sha1()
+    for token, normalized in sorted(items):
+        h.update(token.encode("utf-8"))
+        h.update(b"\t")
+        h.update(normalized.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def fuzzy_walk(text, pos, max_edits, max_len, child, children, value):
+    """
+    trieを辿りながら編集距離の表を一行ずつ更新し, text[pos:]の先頭と
+    編集距離max_edits以内で一致するtokenを全て返す. 先頭の一文字は完全に一致するものに限る.
+    表の最小値がmax_editsを超えた部分木は探索しない
+
+    Arguments
+    ---------
+    text: str
+    pos: int
+        探索を開始する位置
+    max_edits: int
+        許容する編集距離
+    max_len: int
+        最も長いtokenの長さ
+    child: callable
+        (node, 文字) を受け取り遷移先のnodeを返す. なければNone. 0番目のnodeが根
+    children: callable
+        nodeを受け取り (文字, 子node) のiterableを返す
+    value: callable
+        nodeを受け取り正規化された表現を返す. tokenの終端でなければNone
+
+    Returns
+    -------
+    matches: list of (str, int, str, int, int)
+        tokenの文字列, 一致したtext中の終端位置, 正規化された表現, 編集距離, tokenの長さのlist.
+        tokenごとに編集距離が最小 (同じなら終端位置が最も後ろ) のものを一つ返す
+    """
+    if pos >= len(text):
+        return []
+    first = child(0, text[pos])
+    if first is None:
+        return []
+    start = pos + 1
+    target = text[start:start+max_len+max_edits]
+    matches = []
+    # row[j]: 辿ったtokenの先頭からの部分とtext[pos:start+j]との編集距離
+    stack = [(first, list(range(len(target) + 1)), text[pos])]
+    while len(stack) > 0:
+        node, row, token = stack.pop()
+        normalized = value(node)
+        if normalized is not None:
+            cost, j = min((cost, -j) for j, cost in enumerate(row))
+            if cost <= max_edits:
+                matches.append((token, start - j, normalized, cost, len(token)))
+        for c, next_node in children(node):
+            new_row = [row[0] + 1]
+            for j in range(1, len(row)):
+                new_row.append(min(row[j] + 1, new_row[j-1] + 1,
+                                   row[j-1] + (target[j-1] != c)))
+            if min(new_row) <= max_edits:
+                stack.append((next_node, new_row, token + c))
+    return matches
+
+
+class TokenTrie:
+    """
+    token辞書をコンパイルしたtrie.
+    lexerにdictの代わりに渡すと, 位置毎にsliceを作ってdictを引くかわりに
+    textを前から一度だけ辿って最長一致を求める.
+
+    Arguments
+    ---------
+    tokens: dict of {str: str}
+        tokenの文字列をkey, 正規化された表現をvalueにもつdict.
+        load_tokensの戻り値をそのまま渡せる
+
+    Properties
+    ----------
+    children: list of dict of {str: int}
+        node毎の, 文字から子nodeの番号への遷移. 0番目のnodeが根
+    values: list of str or None
+        node毎の正規化された表現. tokenの終端でないnodeはNone
+    """
+
+    def __init__(self, tokens):
+        self.children = [{}]
+        self.values = [None]
+        self.size = 0
+        self.max_len = 0
+        self._fingerprint = None
+        for token, normalized in tokens.items():
+            self._insert(token, normalized)
+
+    @property
+    def fingerprint(self):
+        """
+        辞書の内容を表すhash. 構築後は変わらないので一度だけ計算する
+        """
+        if self._fingerprint is None:
+            self._fingerprint = items_fingerprint(self.items())
+        return self._fingerprint
+
+    def _insert(self, token, normalized):
+        assert len(token) > 0, "token must not be empty"
+        node = 0
+        for c in token:
+            child = self.children[node].get(c)
+            if child is None:
+                child = len(self.children)
+                self.children[node][c] = child
+                self.children.append({})
+                self.values.append(None)
+            node = child
+        if self.values[node] is None:
+            self.size += 1
+        self.values[node] = normalized
+        self.max_len = max(self.max_len, len(token))
+
+    def _find(self, token):
+        return self._find_from(token, 0)
+
+    def _find_from(self, text, pos):
+        node = 0
+        for i in range(pos, len(text)):
+            node = self.children[node].get(text[i])
+            if node is None:
+                return None
+        return node
+
+    def prefix_matches(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを短い順に全て返す
+
+        Arguments
+        ---------
+        text: str
+        pos: int
+            探索を開始する位置
+
+        Returns
+        -------
+        matches: list of (int, str)
+            一致したtokenの終端位置と正規化された表現のlist
+        """
+        children = self.children
+        values = self.values
+        matches = []
+        node = 0
+        for i in range(pos, len(text)):
+            node = children[node].get(text[i])
+            if node is None:
+                break
+            if values[node] is not None:
+                matches.append((i + 1, values[node]))
+        return matches
+
+    def longest_match(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを最長一致で探す
+
+        Arguments
+        ---------
+        text: str
+        pos: int
+            探索を開始する位置
+
+        Returns
+        -------
+        match: (int, str) or None
+            一致したtokenの終端位置と正規化された表現. なければNone
+        """
+        children = self.children
+        values = self.values
+        match = None
+        node = 0
+        for i in range(pos, len(text)):
+            node = children[node].get(text[i])
+            if node is None:
+                break
+            if values[node] is not None:
+                match = (i + 1, values[node])
+        return match
+
+    def fuzzy_matches(self, text, pos, max_edits):
+        """
+        text[pos:]の先頭と編集距離max_edits以内で一致するtokenを全て返す.
+        先頭の一文字は完全に一致するものに限る
+
+        Arguments
+        ---------
+        text: str
+        pos: int
+            探索を開始する位置
+        max_edits: int
+            許容する編集距離
+
+        Returns
+        -------
+        matches: list of (int, str, int, int)
+            一致したtext中の終端位置, 正規化された表現, 編集距離, tokenの長さのlist.
+            tokenごとに編集距離が最小 (同じなら終端位置が最も後ろ) のものを一つ返す
+        """
+        return [match[1:] for match in self.fuzzy_token_matches(text, pos, max_edits)]
+
+    def fuzzy_token_matches(self, text, pos, max_edits):
+        """
+        fuzzy_matchesと同じだが, 各要素の先頭に一致したtokenの文字列を加えて返す
+        """
+        children = self.children
+        return fuzzy_walk(text, pos, max_edits, self.max_len,
+                          lambda node, c: children[node].get(c),
+                          lambda node: children[node].items(),
+                          self.values.__getitem__)
+
+    def extends(self, text, pos=0):
+        """
+        text[pos:]がより長いtokenの先頭と一致していればTrue.
+        textの末尾に文字が追加されると一致するtokenが変わり得るかの判定に使う
+
+        Arguments
+        ---------
+        text: str
+        pos: int
+            探索を開始する位置
+
+        Returns
+        -------
+        ret: bool
+        """
+        node = self._find_from(text, pos)
+        return node is not None and len(self.children[node]) > 0
+
+    def items(self):
+        """
+        (tokenの文字列, 正規化された表現) のlistを返す
+        """
+        result = []
+        stack = [(0, "")]
+        while len(stack) > 0:
+            node, prefix = stack.pop()
+            if self.values[node] is not None:
+                result.append((prefix, self.values[node]))
+            for c, child in self.children[node].items():
+                stack.append((child, prefix + c))
+        return result
+
+    def __getitem__(self, token):
+        node = self._find(token)
+        if node is None or self.values[node] is None:
+            raise KeyError(token)
+        return self.values[node]
+
+    def __contains__(self, token):
+        node = self._find(token)
+        return node is not None and self.values[node] is not None
+
+    def __len__(self):
+        return self.size
+
+
+class LayeredTrie:
+    """
+    共有の辞書 (base) の上に小さな辞書 (overlay) を重ねたtoken辞書.
+    baseを複製せずに参照するので, 利用者毎の辞書の追加や削除でbaseを作り直す必要はなく,
+    メモリはoverlayの大きさの分しか増えない.
+    同じtokenが複数の層にある場合は後ろの層の値を使う
+
+    Arguments
+    ---------
+    base: TokenTrie or MappedTokens
+        共有の辞書
+    overlays: dict of {str: str} or TokenTrie
+        重ねる辞書. dictはTokenTrieにコンパイルする
+
+    Properties
+    ----------
+    layers: list
+        baseを先頭とする辞書のlist
+    disambiguation_map: dict of {str: dict of {str: str} or None
+        baseが持っていればbaseのdisambiguation_map
+    """
+
+    def __init__(self, base, *overlays):
+        self.layers = [base]
+        for overlay in overlays:
+            if isinstance(overlay, dict):
+                overlay = TokenTrie(overlay)
+            self.layers.append(overlay)
+        self.disambiguation_map = getattr(base, "disambiguation_map", None)
+        self._fingerprint = None
+        self._len = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            for layer in self.layers:
+                h.update(layer.fingerprint.encode("utf-8"))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def prefix_matches(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを短い順に全て返す. TokenTrie.prefix_matchesと同じ
+        """
+        if len(self.layers) == 1:
+            return self.layers[0].prefix_matches(text, pos)
+        matches = {}
+        for layer in self.layers:
+            for end, normalized in layer.prefix_matches(text, pos):
+                matches[end] = normalized
+        return sorted(matches.items())
+
+    def longest_match(self, text, pos=0):
+        """
+        text[pos:]の先頭に一致するtokenを最長一致で探す. TokenTrie.longest_matchと同じ
+        """
+        match = None
+        for layer in self.layers:
+            m = layer.longest_match(text, pos)
+            if m is not None and (match is None or m[0] >= match[0]):
+                match = m
+        return match
+
+    def fuzzy_matches(self, text, pos, max_edits):
+        """
+        text[pos:]の先頭と編集距離max_edits以内で一致するtokenを全て返す.
+        TokenTrie.fuzzy_matchesと同じ
+        """
+        return [match[1:] for match in self.fuzzy_token_matches(text, pos, max_edits)]
+
+    def fuzzy_token_matches(self, text, pos, max_edits):
+        """
+        fuzzy_matchesと同じだが, 各要素の先頭に一致したtokenの文字列を加えて返す.
+        同じtokenが複数の層で一致した場合は後ろの層のものを使う
+        """
+        matches = {}
+        for layer in self.layers:
+            for match in layer.fuzzy_token_matches(text, pos, max_edits):
+                matches[match[0]] = match
+        return list(matches.values())
+
+    def extends(self, text, pos=0):
+        """
+        text[pos:]がより長いtokenの先頭と一致していればTrue. TokenTrie.extendsと同じ
+        """
+        return any(layer.extends(text, pos) for layer in self.layers)
+
+    def items(self):
+        """
+        (tokenの文字列, 正規化された表現) のlistを返す
+        """
+        merged = {}
+        for layer in self.layers:
+            merged.update(layer.items())
+        return list(merged.items())
+
+    def __getitem__(self, token):
+        for layer in reversed(self.layers):
+            if token in layer:
+                return layer[token]
+        raise KeyError(token)
+
+    def __contains__(self, token):
+        return any(token in layer for layer in self.layers)
+
+    def __len__(self):
+        """
+        baseの大きさに, overlayにだけあるtokenの数を加える. baseのtokenは列挙しない
+        """
+        if self._len is None:
+            added = set()
+            for i, layer in enumerate(self.layers[1:], 1):
+                for token, _ in layer.items():
+                    if not any(token in lower for lower in self.layers[:i]):
+                        added.add(token)
+            self._len = len(self.layers[0]) + len(added)
+        return self._len
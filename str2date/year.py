@@ -119,8 +119,7 @@ class Year:
                 self.months[m].reset()
         if day is not None:
             for m in range(1, 13):
-                active_days = self.months[m].active()
-                if day in active_days:
+                if day <= self.months[m].digit and self.months[m].check(day):
                     self.months[m].set(day)
                 else:
                     self.months[m].reset()
@@ -155,43 +154,57 @@ class Year:
     def shift(self, year=None, month=None, day=None):
         """
         特定の時間集合の要素を引数で与えられた値だけずらす.
-        集合の要素の最大値・最小値が存在し、ずらした結果閾値を超えてしまった場合、
-        回り込ませるかは継承先のクラス毎に異なる
-        TODO: とりあえずはyearとmonthは無視し、day >= 0を仮定する
+        一年分の日付を一つのBitSetにまとめてずらすので, 月を跨いでもshift一回で済む.
+        ずらした結果年を跨いだ日付はなくなる
+        TODO: とりあえずはyearとmonthは無視する
 
         Arguments
         ---------
         year: int
         month: int
         day: int
+            正なら後ろに, 負なら前にずらす日数
         """
         assert (year is not None) or (month is not None) or (day is not None), "At least an argument must be given"
-        for m in range(12, 0, -1):
-            y_last, m_last, d_last = dateutil.shift_days(self.year, m, dateutil.days_in_month(self.year, m), -day)
-            if y_last < self.year:
-                self.months[m].reset()
-                continue
-            y_first, m_first, d_first = dateutil.shift_days(self.year, m, 1, -day)
-            if y_first < y_last:
-                " 月の初日 + 月末との差分の日数. "
-                d_to = 1 + (dateutil.days_in_month(y_first, m_first) - d_first + 1)
-                if m == 1:
-                    " 1月の場合、bitset.copyだけだとcopy元の値を消せないのでshiftでずらす "
-                    self.months[1].shift(d_to-1, wrap=False)
-                else:
-                    bitset.copy(self.months[1], self.months[m], 1, d_last, d_to)
-                continue
-            d_to = 1
-            copy_list = []
-            while m_first < m_last:
-                copy_list.append((m_first, m, d_first, dateutil.days_in_month(y_first, m_first), d_to))
-                d_to += dateutil.days_in_month(y_first, m_first) - d_first + 1
-                m_first += 1
-                d_first = 1
-            copy_list.append((m_first, m, d_first, d_last, d_to))
-            while len(copy_list) > 0:
-                x = copy_list.pop()
-                bitset.copy(self.months[x[0]], self.months[x[1]], x[2], x[3], x[4])
+        if day is None or day == 0:
+            return
+        days = self.to_bitset()
+        if abs(day) >= days.digit:
+            days.reset()
+        else:
+            days.shift(day, wrap=False)
+        self.from_bitset(days)
+
+    def to_bitset(self):
+        """
+        一年分の日付の集合を, 元日を1桁目とする一つのBitSetにして返す
+
+        Returns
+        -------
+        days: BitSet
+            その年の日数の桁をもつBitSet
+        """
+        days = bitset.BitSet(365 + dateutil._is_leap(self.year))
+        bits = 0
+        for m in range(1, 13):
+            bits |= self.months[m].bits << dateutil._days_before_month(self.year, m)
+        days.set_bits(bits)
+        return days
+
+    def from_bitset(self, days):
+        """
+        to_bitsetの形式のBitSetで日付の集合を置き換える
+
+        Arguments
+        ---------
+        days: BitSet
+            元日を1桁目とするBitSet
+        """
+        assert days.digit == 365 + dateutil._is_leap(self.year)
+        for m in range(1, 13):
+            start = dateutil._days_before_month(self.year, m)
+            self.months[m].reset()
+            self.months[m].set_bits(days.extract_range(start + 1, start + self.months[m].digit))
 
     def active(self):
         """
@@ -206,8 +219,7 @@ class Year:
             return []
         active_dates = []
         for m in range(1, 13):
-            days = self.months[m].active()
-            for d in days:
+            for d in self.months[m].iter_digits():
                 active_dates.append(datetime(self.year, m, d))
         return active_dates
 
@@ -220,11 +232,7 @@ class Year:
         s: datetime.datetime or None
             一番早い日
         """
-        active_dates = self.active()
-        if len(active_dates) == 0:
-            return None
-        else:
-            return active_dates[0]
+        return self.next(None)
 
     def last(self):
         """
@@ -235,11 +243,7 @@ class Year:
         s: datetime.datetime or None
             一番遅い日
         """
-        active_dates = self.active()
-        if len(active_dates) == 0:
-            return None
-        else:
-            return active_dates[-1]
+        return self.before(None)
 
     def next(self, d):
         """
@@ -247,18 +251,26 @@ class Year:
 
         Arguments
         ---------
-        d: datetime.dateetime
-            起点となる日
+        d: datetime.dateetime or None
+            起点となる日. Noneなら集合の最初の日を返す
 
         Returns
         -------
         s: datetime.datetime or None
             一番早い日. なければNoneを返す
         """
-        active_dates = self.active()
-        for date in active_dates:
-            if date > d:
-                return date
+        if self.year is None:
+            return None
+        month, day = 1, 0
+        if d is not None:
+            if d.year > self.year:
+                return None
+            if d.year == self.year:
+                month, day = d.month, d.day
+        for m in range(month, 13):
+            found = self.months[m].next_after(day if m == month else 0)
+            if found is not None:
+                return datetime(self.year, m, found)
         return None
 
     def before(self, d):
@@ -267,18 +279,29 @@ class Year:
 
         Arguments
         ---------
-        d: datetime.dateetime
-            起点となる日
+        d: datetime.dateetime or None
+            起点となる日. Noneなら集合の最後の日を返す
 
         Returns
         -------
         s: datetime.datetime or None
             一番遅い日
         """
-        active_dates = self.active()
-        for date in active_dates[::-1]:
-            if date < d:
-                return date
+        if self.year is None:
+            return None
+        month, day = 12, 32
+        if d is not None:
+            if d.year < self.year:
+                return None
+            if d.year == self.year:
+                month, day = d.month, d.day
+                if d > datetime(d.year, d.month, d.day):
+                    # 時刻を持つ場合は当日の0時もdより前
+                    day += 1
+        for m in range(month, 0, -1):
+            found = self.months[m].prev_before(day if m == month else 32)
+            if found is not None:
+                return datetime(self.year, m, found)
         return None
 
     def check(self, year=None, month=None, day=None):
@@ -0,0 +1,37 @@
+""" 複数のテストで共有する辞書とfixture """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from str2date.tokenfile import compile_tokens
+
+TOKENS = {
+    "来": "o_next", "次": "o_next", "週": "s_week", "年": "s_year",
+    "月": "a_moon", "日": "a_sun", "土": "d_saturday",
+    "火曜日": "d_tuesday", "火曜": "d_tuesday", "火": "d_tuesday",
+    "ゴールデンウィーク": "d_goldenweek",
+}
+DISAMBIGUATION_MAP = {
+    "d_": {"a_moon": "d_monday", "a_sun": "d_sunday"},
+    "s_": {"a_moon": "s_month", "a_sun": "s_day"}
+}
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    テスト毎に一時ディレクトリself.tmpdirを作り, 終了後に消す
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def compile_tokens(self, tokens=TOKENS, disambiguation_map=DISAMBIGUATION_MAP, name="tokens.bin"):
+        """
+        tokensを一時ディレクトリにコンパイルし, そのpathを返す
+        """
+        path = os.path.join(self.tmpdir, name)
+        compile_tokens(tokens, path, disambiguation_map)
+        return path
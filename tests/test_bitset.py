@@ -1,6 +1,6 @@
 import unittest
 
-from str2date.bitset import BitSet, _trailing_digit, _get_nonzero_digits, copy
+from str2date.bitset import BitSet, FrozenBitSet, _trailing_digit, _get_nonzero_digits, copy
 
 class TestBitSet(unittest.TestCase):
     def test_set(self):
@@ -157,6 +157,142 @@ class TestBitSet(unittest.TestCase):
         digits = _get_nonzero_digits(0b10000000)
         self.assertEqual(digits, [8])
 
+    def test_iter_digits(self):
+        b = BitSet(64)
+        self.assertEqual(list(b.iter_digits()), [])
+        b.add(1)
+        b.add(3)
+        b.add(64)
+        self.assertEqual(list(b.iter_digits()), [1, 3, 64])
+        self.assertEqual(b.active(), [1, 3, 64])
+
+    def test_first_last(self):
+        b = BitSet(8)
+        self.assertIsNone(b.first())
+        self.assertIsNone(b.last())
+        self.assertEqual(b.count(), 0)
+        b.add(3)
+        b.add(6)
+        self.assertEqual(b.first(), 3)
+        self.assertEqual(b.last(), 6)
+        self.assertEqual(b.count(), 2)
+
+    def test_next_after(self):
+        b = BitSet(8)
+        b.add(3)
+        b.add(6)
+        self.assertEqual(b.next_after(0), 3)
+        self.assertEqual(b.next_after(3), 6)
+        self.assertEqual(b.next_after(5), 6)
+        self.assertIsNone(b.next_after(6))
+        self.assertIsNone(b.next_after(8))
+
+    def test_prev_before(self):
+        b = BitSet(8)
+        b.add(3)
+        b.add(6)
+        self.assertEqual(b.prev_before(9), 6)
+        self.assertEqual(b.prev_before(6), 3)
+        self.assertEqual(b.prev_before(4), 3)
+        self.assertIsNone(b.prev_before(3))
+        self.assertIsNone(b.prev_before(1))
+
+    def test_operators(self):
+        a = BitSet(4)
+        a.set_bits(0b0011)
+        b = BitSet(4)
+        b.set_bits(0b0110)
+        self.assertEqual((a | b).bits, 0b0111)
+        self.assertEqual((a & b).bits, 0b0010)
+        self.assertEqual((a - b).bits, 0b0001)
+        self.assertEqual((a ^ b).bits, 0b0101)
+        # 補集合は桁数の範囲に収まる
+        self.assertEqual((~a).bits, 0b1100)
+        self.assertEqual(a.bits, 0b0011)
+
+        c = a
+        c |= b
+        self.assertIs(c, a)
+        self.assertEqual(a.bits, 0b0111)
+        a -= b
+        self.assertEqual(a.bits, 0b0001)
+        a ^= b
+        self.assertEqual(a.bits, 0b0111)
+        a &= b
+        self.assertEqual(a.bits, 0b0110)
+
+        with self.assertRaises(AssertionError):
+            a | BitSet(5)
+
+    def test_range(self):
+        b = BitSet(8)
+        b.set_range(2, 4)
+        self.assertEqual(b.bits, 0b00001110)
+        b.set_range(7, 8)
+        self.assertEqual(b.bits, 0b11001110)
+        self.assertEqual(b.extract_range(3, 7), 0b10011)
+        b.clear_range(3, 7)
+        self.assertEqual(b.bits, 0b10000010)
+
+    def test_wide(self):
+        # 64桁を超える桁数も扱える
+        b = BitSet(3660)
+        b.add(1)
+        b.add(366)
+        b.add(3660)
+        self.assertEqual(b.active(), [1, 366, 3660])
+        self.assertEqual(b.get_nonzero_digits(), [1, 366, 3660])
+        self.assertEqual((b.first(), b.last(), b.count()), (1, 3660, 3))
+        self.assertEqual(b.next_after(1), 366)
+        self.assertEqual(b.prev_before(3660), 366)
+        self.assertEqual((~b).count(), 3657)
+        b.shift(-365, wrap=False)
+        self.assertEqual(b.active(), [1, 3295])
+        b.set_range(100, 200)
+        self.assertEqual(b.extract_range(100, 400), (1 << 101) - 1)
+
+    def test_select_rank(self):
+        b = BitSet(8)
+        b.set_bits(0b10110100)
+        self.assertEqual([b.select(k) for k in range(1, 5)], [3, 5, 6, 8])
+        self.assertIsNone(b.select(5))
+        self.assertEqual([b.rank(n) for n in (1, 3, 4, 8, 9)], [0, 0, 1, 3, 4])
+
+        # 64桁毎のblockを跨ぐ場合
+        b = BitSet(400)
+        for n in (2, 64, 65, 200, 400):
+            b.add(n)
+        self.assertEqual([b.select(k) for k in range(1, 6)], [2, 64, 65, 200, 400])
+        self.assertIsNone(b.select(6))
+        for k in range(1, 6):
+            self.assertEqual(b.rank(b.select(k)), k - 1)
+
+    def test_frozen(self):
+        b = BitSet(8)
+        b.set_bits(0b1010)
+        f = b.freeze()
+        self.assertEqual(f, FrozenBitSet(8, 0b1010))
+        self.assertEqual(f, b)
+        self.assertEqual(hash(f), hash(FrozenBitSet(8, 0b1010)))
+        self.assertNotEqual(f, FrozenBitSet(9, 0b1010))
+        self.assertEqual({f: 1}[FrozenBitSet(8, 0b1010)], 1)
+        with self.assertRaises(AttributeError):
+            f.bits = 0
+        with self.assertRaises(TypeError):
+            hash(b)
+
+        # 変更しない操作はBitSetと同じ
+        self.assertEqual((f.first(), f.last(), f.select(2)), (2, 4, 4))
+        self.assertEqual(f | FrozenBitSet(8, 0b1), FrozenBitSet(8, 0b1011))
+        self.assertIsInstance(~f, FrozenBitSet)
+
+        # 元のBitSetを変更してもFrozenBitSetは変わらない
+        b.add(1)
+        self.assertEqual(f.bits, 0b1010)
+        t = f.thaw()
+        t.add(8)
+        self.assertEqual((t.bits, f.bits), (0b10001010, 0b1010))
+
     def test_copy(self):
         b_from = BitSet(3)
         b_from.add(2)
@@ -0,0 +1,51 @@
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+
+import str2date.lexer as lx
+from str2date.bytelexer import ByteTrie, iter_matching_lines, lex_bytes
+from tests import DISAMBIGUATION_MAP, TOKENS
+
+class TestByteLexer(unittest.TestCase):
+    def test_same_as_lexer(self):
+        trie = ByteTrie(TOKENS)
+        texts = ["次のゴールデンウィークの最終日", "12月の火曜日", "5月の日月火",
+                 "二千十八年１２月の土日", "abc次"]
+        for text in texts:
+            buf = text.encode("utf-8")
+            result = lex_bytes(buf, trie, DISAMBIGUATION_MAP)
+            self.assertEqual([t.token_id for t in result],
+                             lx.lexer(text, TOKENS, DISAMBIGUATION_MAP))
+            for token in result:
+                # byte位置で元の文字列を取り出せる
+                surface = buf[token.start:token.end].decode("utf-8")
+                if token.token_id != "o_or":
+                    self.assertTrue(len(surface) > 0)
+
+    def test_offsets(self):
+        buf = "会議: 12月の火曜日".encode("utf-8")
+        result = lex_bytes(memoryview(buf), ByteTrie(TOKENS), DISAMBIGUATION_MAP)
+        self.assertEqual(result[0], lx.Token(12, 8, 10))
+        self.assertEqual(buf[result[2].start:result[2].end].decode("utf-8"), "火曜日")
+
+    def test_iter_matching_lines(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "log.txt")
+            with open(path, "wb") as fp:
+                fp.write("hello\n次の火曜日\nworld\n5月の土日".encode("utf-8"))
+            with open(path, "rb") as fp:
+                buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                lines = list(iter_matching_lines(buf, ByteTrie(TOKENS), DISAMBIGUATION_MAP))
+                self.assertEqual(len(lines), 2)
+                start, end, result = lines[0]
+                self.assertEqual(buf[start:end].decode("utf-8"), "次の火曜日")
+                self.assertEqual([t.token_id for t in result], ["o_next", "d_tuesday"])
+                start, end, result = lines[1]
+                self.assertEqual([t.token_id for t in result],
+                                 [5, "s_month", "d_saturday", "o_or", "d_sunday"])
+                buf.close()
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+
+import str2date.lexer as lx
+from str2date.cache import LRUCache, LexerCache, Snapshot, dictionary_fingerprint
+from str2date.trie import TokenTrie, items_fingerprint
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        # bが最も古く参照されたので捨てられる
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "evictions": 1, "size": 2})
+
+
+class TestLexerCache(unittest.TestCase):
+    def test_lexer(self):
+        tokens = {"月": "a_moon", "火": "d_tuesday"}
+        disambiguate_map = {"d_": {"a_moon": "d_monday"}, "s_": {"a_moon": "s_month"}}
+        cache = LexerCache(tokens, disambiguate_map, maxsize=8)
+        result = cache.lexer("12月")
+        self.assertEqual(result, tuple(lx.lexer("12月", tokens, disambiguate_map)))
+        self.assertIs(cache.lexer("12月"), result)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # 辞書が異なればfingerprintも異なる
+        other = LexerCache({"月": "s_month", "火": "d_tuesday"}, disambiguate_map)
+        self.assertEqual(other.lexer("12月"), (12, "s_month"))
+        self.assertNotEqual(other.fingerprint, cache.fingerprint)
+
+    def test_snapshot(self):
+        disambiguate_map = {"d_": {"a_moon": "d_monday"}, "s_": {"a_moon": "s_month"}}
+        def snapshot(version, tokens):
+            trie = TokenTrie(tokens)
+            return Snapshot(version, dictionary_fingerprint(trie, disambiguate_map), trie, disambiguate_map)
+        current = [snapshot(1, {"月": "a_moon"})]
+        cache = LexerCache(lambda: current[0], maxsize=8)
+        result = cache.lexer("12月")
+        self.assertEqual(result, (12, "s_month"))
+        self.assertIs(cache.lexer("12月"), result)
+
+        # 辞書が差し替えられれば新しい辞書で計算し直す
+        current[0] = snapshot(2, {"月": "a_moon", "火": "d_tuesday", "は": "s_month"})
+        self.assertEqual(cache.lexer("12月"), (12, "s_month"))
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertEqual(cache.lexer("火"), ("d_tuesday",))
+        self.assertEqual(cache.fingerprint, current[0].fingerprint)
+
+        # 内容が同じ辞書に戻せば以前のentryをそのまま使う
+        current[0] = snapshot(3, {"月": "a_moon"})
+        self.assertIs(cache.lexer("12月"), result)
+
+    def test_hit_does_not_rehash(self):
+        tokens = {"月": "s_month"}
+        with mock.patch("str2date.trie.items_fingerprint", wraps=items_fingerprint) as fingerprint, \
+                mock.patch("str2date.cache.dictionary_fingerprint", wraps=dictionary_fingerprint) as dictionary:
+            cache = LexerCache(tokens, {"d_": {}})
+            self.assertEqual((fingerprint.call_count, dictionary.call_count), (1, 1))
+            cache.lexer("12月")
+            cache.lexer("12月")
+            self.assertEqual((fingerprint.call_count, dictionary.call_count), (1, 1))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_fingerprint(self):
+        tokens = {"月": "a_moon", "火": "d_tuesday"}
+        self.assertEqual(dictionary_fingerprint(tokens), TokenTrie(tokens).fingerprint)
+        self.assertNotEqual(dictionary_fingerprint(tokens),
+                            dictionary_fingerprint({"月": "s_month", "火": "d_tuesday"}))
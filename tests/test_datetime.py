@@ -1,6 +1,6 @@
 import unittest
 
-from str2date.datetime import Datetime, UnitType
+from str2date.datetime import Datetime, FrozenDatetime, UnitType
 
 class TestDatetime(unittest.TestCase):
     def test_check(self):
@@ -129,3 +129,26 @@ class TestDatetime(unittest.TestCase):
         self.assertTrue(d.check(week=1))
         self.assertTrue(d.check(month=1))
         self.assertTrue(d.check(year=2018))
+
+    def test_frozen(self):
+        import datetime
+        d = Datetime()
+        d.set_by_datetime(datetime.datetime(2018, 1, 2))
+        f = d.freeze()
+        self.assertIsInstance(f, FrozenDatetime)
+        self.assertEqual(f, d)
+        self.assertEqual(hash(f), hash(d.freeze()))
+        self.assertEqual({f: 1}[d.freeze()], 1)
+        self.assertTrue(f.check(day=2, wday=2, week=1, month=1, year=2018))
+        self.assertEqual(f.days(), [2])
+        with self.assertRaises(AttributeError):
+            f.year = 2019
+        with self.assertRaises(TypeError):
+            hash(d)
+
+        # 元のDatetimeを変更してもFrozenDatetimeは変わらない
+        d.add(3, UnitType.DAY)
+        self.assertNotEqual(f, d)
+        t = f.thaw()
+        t.add(4, UnitType.DAY)
+        self.assertEqual((t.days(), f.days()), ([2, 4], [2]))
@@ -0,0 +1,65 @@
+import unittest
+
+import str2date.lexer as lx
+from str2date.fuzzy import FuzzyToken, fuzzy_lexer
+from str2date.tokenfile import MappedTokens
+from str2date.trie import LayeredTrie, TokenTrie
+from tests import DISAMBIGUATION_MAP, TOKENS, TempDirTestCase
+
+class TestFuzzy(unittest.TestCase):
+    def test_fuzzy_matches(self):
+        trie = TokenTrie(TOKENS)
+        matches = trie.fuzzy_matches("次のゴールデンウイーク", 2, 1)
+        self.assertEqual(matches, [(11, "d_goldenweek", 1, 9)])
+        # 先頭の一文字は一致する必要がある
+        self.assertEqual(trie.fuzzy_matches("コールデンウィーク", 0, 1), [])
+        # 挿入, 削除
+        self.assertEqual(trie.fuzzy_matches("ゴールデンウィーーク", 0, 1)[0][:3], (10, "d_goldenweek", 1))
+        self.assertEqual(trie.fuzzy_matches("ゴールデンウーク", 0, 1)[0][:3], (8, "d_goldenweek", 1))
+
+    def test_fuzzy_lexer(self):
+        result = fuzzy_lexer("次のゴールデンウイークの土日", TOKENS, DISAMBIGUATION_MAP)
+        self.assertEqual(result, [
+            FuzzyToken("o_next", 0, 1), FuzzyToken("d_goldenweek", 2, 11, cost=1),
+            FuzzyToken("d_saturday", 12, 13), FuzzyToken("o_or", 13, 13),
+            FuzzyToken("d_sunday", 13, 14)])
+
+    def test_same_as_lexer(self):
+        for text in ["次のゴールデンウィークの最終日", "12月の火曜日", "5月の日月火"]:
+            result = fuzzy_lexer(text, TOKENS, DISAMBIGUATION_MAP)
+            self.assertEqual([t.token_id for t in result], lx.lexer(text, TOKENS, DISAMBIGUATION_MAP))
+            self.assertTrue(all(t.cost == 0 for t in result))
+
+    def test_min_length(self):
+        result = fuzzy_lexer("火よう日", TOKENS, DISAMBIGUATION_MAP, max_edits=2, min_length=3)
+        self.assertEqual(result, [FuzzyToken("d_tuesday", 0, 4, cost=2)])
+        result = fuzzy_lexer("火よう日", TOKENS, DISAMBIGUATION_MAP, max_edits=2)
+        self.assertEqual([t.token_id for t in result], ["d_tuesday", "s_day"])
+
+
+class TestFuzzyMapped(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mapped = MappedTokens(self.compile_tokens())
+        self.addCleanup(self.mapped.close)
+
+    def test_mapped(self):
+        text = "次のゴールデンウイークの土日"
+        self.assertEqual(self.mapped.max_len, 9)
+        self.assertEqual(self.mapped.fuzzy_matches(text, 2, 1), TokenTrie(TOKENS).fuzzy_matches(text, 2, 1))
+        self.assertEqual(fuzzy_lexer(text, self.mapped), fuzzy_lexer(text, TOKENS, DISAMBIGUATION_MAP))
+
+    def test_layered(self):
+        # 後ろの層のtokenが優先される
+        layered = LayeredTrie(self.mapped, {"ゴールデンウィーク": "d_gw", "ゴールデンタイム": "d_goldentime"})
+        matches = layered.fuzzy_matches("ゴールデンウイーク", 0, 1)
+        self.assertEqual(matches, [(9, "d_gw", 1, 9)])
+        result = fuzzy_lexer("次のゴールデンウイーク", layered)
+        self.assertEqual(result, [FuzzyToken("o_next", 0, 1), FuzzyToken("d_gw", 2, 11, cost=1)])
+
+    def test_unsupported(self):
+        class Tokens:
+            def longest_match(self, text, pos=0):
+                return None
+        with self.assertRaises(ValueError):
+            fuzzy_lexer("次", Tokens())
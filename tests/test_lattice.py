@@ -0,0 +1,31 @@
+import unittest
+
+import str2date.lexer as lx
+from str2date.lattice import lattice_lexer
+from str2date.trie import TokenTrie
+from tests import DISAMBIGUATION_MAP, TOKENS
+
+class TestLattice(unittest.TestCase):
+    def test_same_as_lexer(self):
+        texts = ["次のゴールデンウィークの最終日", "12月の火曜日", "5月の日月火",
+                 "月火", "火月", "12月", "土日", "aaaaa"]
+        tokens = dict(TOKENS, a="1", aa="2", aaa="3")
+        for text in texts:
+            expected = lx.lexer(text, tokens, DISAMBIGUATION_MAP)
+            self.assertEqual(lattice_lexer(text, tokens, DISAMBIGUATION_MAP), expected)
+            self.assertEqual(lattice_lexer(text, TokenTrie(tokens), DISAMBIGUATION_MAP), expected)
+
+    def test_avoid_skip(self):
+        tokens = {"ab": "1", "a": "2", "bc": "3"}
+        self.assertEqual(lx.lexer("abc", tokens), ["1"])
+        self.assertEqual(lattice_lexer("abc", tokens), ["2", "3"])
+
+    def test_costs(self):
+        tokens = {"ab": "1", "a": "2", "bc": "3"}
+        result = lattice_lexer("abc", tokens, token_costs={"3": 5.0})
+        self.assertEqual(result, ["1"])
+
+    def test_spans(self):
+        result = lattice_lexer("土日", TOKENS, DISAMBIGUATION_MAP, spans=True)
+        self.assertEqual(result, [lx.Token("d_saturday", 0, 1), lx.Token("o_or", 1, 1),
+                                  lx.Token("d_sunday", 1, 2)])
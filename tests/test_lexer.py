@@ -1,6 +1,7 @@
 import unittest
 
 import str2date.lexer as lx
+from str2date.trie import TokenTrie
 
 class TestLexer(unittest.TestCase):
     def test_match(self):
@@ -59,3 +60,82 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(result[0], "d_monday")
         result = lx.lexer("火月", tokens, disambiguate_map)
         self.assertEqual(result[-1], "d_monday")
+
+    def test_match_trie(self):
+        tokens = TokenTrie({"次": "1", "ゴールデンウィーク": "2", "ゴールデン": "3"})
+        token = lx.match("ゴールデンウィークの最終日", tokens)
+        self.assertEqual(token, "ゴールデンウィーク")
+        token = lx.match("ゴールデンウィーの最終日", tokens)
+        self.assertEqual(token, "ゴールデン")
+        token = lx.match("の最終日", tokens)
+        self.assertEqual(token, None)
+
+    def test_lexer_trie(self):
+        tokens = {"月": "a_moon", "火": "d_tuesday", "a": "1", "aa": "2", "aaa": "3"}
+        disambiguate_map = {"d_": {"a_moon": "d_monday"}, "s_": {"a_moon": "s_month"}}
+        trie = TokenTrie(tokens)
+        for text in ["aaaaa", "12aa345aaa6789", "12月", "月火", "火月", "x12月の火曜"]:
+            self.assertEqual(lx.lexer(text, trie, disambiguate_map),
+                             lx.lexer(text, tokens, disambiguate_map))
+
+    def test_match_pos(self):
+        tokens = {"次": "1", "ゴールデンウィーク": "2"}
+        token = lx.match("次のゴールデンウィーク", tokens, 2)
+        self.assertEqual(token, "ゴールデンウィーク")
+        token = lx.match("次のゴールデンウィーク", TokenTrie(tokens), 2)
+        self.assertEqual(token, "ゴールデンウィーク")
+
+    def test_lexer_spans(self):
+        tokens = {"月": "a_moon", "火": "d_tuesday", "土": "d_saturday", "日": "a_sun"}
+        disambiguate_map = {"d_": {"a_moon": "d_monday", "a_sun": "d_sunday"},
+                            "s_": {"a_moon": "s_month", "a_sun": "s_day"}}
+        text = "12月の土日"
+        result = lx.lexer(text, tokens, disambiguate_map, spans=True)
+        self.assertEqual(result, [
+            lx.Token(12, 0, 2), lx.Token("s_month", 2, 3),
+            lx.Token("d_saturday", 4, 5), lx.Token("o_or", 5, 5), lx.Token("d_sunday", 5, 6)])
+        self.assertEqual([t.token_id for t in result], lx.lexer(text, tokens, disambiguate_map))
+        self.assertEqual(text[result[1].start:result[1].end], "月")
+
+    def test_lexer_kanji_numeric(self):
+        tokens = {"年": "s_year", "月": "s_month"}
+        cases = [("2020年", 2020), ("２０２０年", 2020), ("二〇二〇年", 2020),
+                 ("二千十八年", 2018), ("十二月", 12), ("三十一", 31),
+                 ("千九百九十九年", 1999), ("1万", 10000), ("十", 10)]
+        for text, number in cases:
+            result = lx.lexer(text, tokens)
+            self.assertEqual(result[0], number)
+            self.assertTrue(isinstance(result[0], int))
+
+    def test_lex_many(self):
+        tokens = {"月": "a_moon", "火": "d_tuesday"}
+        disambiguate_map = {"d_": {"a_moon": "d_monday"}, "s_": {"a_moon": "s_month"}}
+        texts = ["12月", "月火", "12月", "火", "12月"] * 3
+        expected = [lx.lexer(text, tokens, disambiguate_map) for text in texts]
+        for workers in [1, 2]:
+            result = list(lx.lex_many(texts, tokens, disambiguate_map, workers=workers, chunksize=4))
+            self.assertEqual(result, expected)
+            self.assertIsNot(result[0], result[2])
+
+    def test_incremental_lexer(self):
+        tokens = {"来": "o_next", "来週": "o_next_week", "週": "s_week",
+                  "月": "a_moon", "日": "a_sun", "土": "d_saturday", "火": "d_tuesday",
+                  "ゴールデンウィーク": "d_goldenweek", "ゴー": "x_go"}
+        disambiguate_map = {"d_": {"a_moon": "d_monday", "a_sun": "d_sunday"},
+                            "s_": {"a_moon": "s_month", "a_sun": "s_day"}}
+        texts = ["来週の土日", "12月の月火", "二千十八年", "次のゴールデンウィーク", "ゴールド", "月"]
+        for text in texts:
+            for spans in [False, True]:
+                incremental = lx.IncrementalLexer(tokens, disambiguate_map, spans=spans)
+                for i in range(len(text)):
+                    result = incremental.append(text[i])
+                    self.assertEqual(result, lx.lexer(text[:i+1], tokens, disambiguate_map, spans=spans))
+
+        # 複数文字をまとめて追加しても同じ結果になる
+        incremental = lx.IncrementalLexer(tokens, disambiguate_map)
+        incremental.append("来")
+        self.assertEqual(incremental.result(), ["o_next"])
+        incremental.append("週の土")
+        self.assertEqual(incremental.append("日"), ["o_next_week", "d_saturday", "o_or", "d_sunday"])
+        incremental.reset()
+        self.assertEqual(incremental.append("12月"), [12, "s_month"])
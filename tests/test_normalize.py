@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+import str2date.lexer as lx
+from str2date.normalize import normalize, normalize_tokens, normalize_with_offsets
+
+class TestNormalize(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("２０２０年１２月"), "2020年12月")
+        self.assertEqual(normalize("ｺﾞｰﾙﾃﾞﾝｳｨｰｸ"), "ゴールデンウィーク")
+        self.assertEqual(normalize("ﾊﾟｰﾃｨｰ"), "パーティー")
+        # 合成できない濁点は全角にする
+        self.assertEqual(normalize("ﾞｱﾞ"), "゛ア゛")
+        self.assertEqual(normalize("1日～3日"), "1日〜3日")
+        self.assertEqual(normalize("1日~3日"), "1日〜3日")
+        self.assertEqual(normalize("３ヵ月"), "3ヶ月")
+        self.assertEqual(normalize("　ＡＢＣ"), " ABC")
+
+    def test_offsets(self):
+        text = "２０年～ｺﾞｰﾙﾃﾞﾝ"
+        normalized, offsets = normalize_with_offsets(text)
+        self.assertEqual(normalized, "20年〜ゴールデン")
+        self.assertEqual(len(offsets), len(normalized) + 1)
+        self.assertEqual(offsets, [0, 1, 2, 3, 4, 6, 7, 8, 10, 11])
+        # 位置が変わらなければoffsetsは作らない
+        self.assertEqual(normalize_with_offsets("２０年～ｳｨｰｸ"), ("20年〜ウィーク", None))
+
+    def test_normalize_without_offsets(self):
+        # 位置が不要な場合はoffsetsを作らない
+        with mock.patch("str2date.lexer.normalize_with_offsets") as with_offsets:
+            self.assertEqual(normalize("ｺﾞｰﾙﾃﾞﾝ"), "ゴールデン")
+            self.assertEqual(lx.lexer("１２ｶﾞﾂ", {"ガツ": "s_month"}, normalized=True), [12, "s_month"])
+        self.assertEqual(with_offsets.call_count, 0)
+
+    def test_lexer(self):
+        tokens = normalize_tokens({"ヵ月": "s_month", "ｳｨｰｸ": "s_week", "〜": "o_to"})
+        text = "３ヵ月～２ｳｨｰｸ"
+        result = lx.lexer(text, tokens, spans=True, normalized=True)
+        self.assertEqual([t.token_id for t in result], [3, "s_month", "o_to", 2, "s_week"])
+        # 位置は元のtextの位置と一致する
+        self.assertEqual(text[result[1].start:result[1].end], "ヵ月")
+        self.assertEqual(text[result[4].start:result[4].end], "ｳｨｰｸ")
+
+    def test_lexer_voiced(self):
+        tokens = normalize_tokens({"次の": "o_next", "ゴールデンウィーク": "d_goldenweek"})
+        text = "次のｺﾞｰﾙﾃﾞﾝｳｨｰｸ"
+        self.assertEqual(lx.lexer(text, tokens, normalized=True), ["o_next", "d_goldenweek"])
+        result = lx.lexer(text, tokens, spans=True, normalized=True)
+        self.assertEqual(text[result[1].start:result[1].end], "ｺﾞｰﾙﾃﾞﾝｳｨｰｸ")
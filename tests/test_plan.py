@@ -0,0 +1,231 @@
+import unittest
+
+from datetime import datetime
+from str2date.plan import *
+
+class TestPlan(unittest.TestCase):
+    def test_compile(self):
+        plan = compile_plan(["o_next", "s_week", "d_saturday", "o_or", "d_sunday"])
+        self.assertEqual(plan.ops, (Instr("shift", "week", 1),
+                                    Instr("filter", "wday", frozenset([6, 7]))))
+
+        plan = compile_plan([12, "s_month", 2, "s_times", "d_tuesday"])
+        self.assertEqual(plan.ops, (Instr("set", "month", 12),
+                                    Instr("scope", "month", None),
+                                    Instr("filter", "wday", frozenset([2])),
+                                    Instr("nth", "day", 2)))
+
+        plan = compile_plan(["o_next", "d_tuesday", "o_or", "d_friday"])
+        self.assertEqual(plan.ops, (Instr("next", "wday", frozenset([2, 5])),))
+
+        plan = compile_plan(["p_heisei", 30, "s_year", 12, "s_month"])
+        self.assertEqual(plan.ops, (Instr("set", "year", 2018), Instr("set", "month", 12)))
+
+    def test_compile_error(self):
+        with self.assertRaises(ValueError):
+            compile_plan(["d_unknown"])
+        with self.assertRaises(ValueError):
+            compile_plan(["o_or", "d_sunday"])
+        with self.assertRaises(ValueError):
+            compile_plan([3, "s_week"])
+
+    def test_cache(self):
+        tokens = ["o_next", "s_month", "o_last", "s_day"]
+        plan = compile_plan(tokens)
+        hits = plan_cache.hits
+        self.assertEqual(compile_plan(list(tokens)), plan)
+        self.assertEqual(plan_cache.hits, hits + 1)
+        self.assertEqual(hash(plan), hash(compile_plan(tokens)))
+
+    def test_plan_cache(self):
+        # 束縛とcompile時の評価は二回目以降行わない
+        tokens = [2020, "s_year", 13, "s_day", "d_friday"]
+        plan = compile_plan(tokens)
+        hits = plan_cache.hits
+        self.assertIs(compile_plan(list(tokens)), plan)
+        self.assertEqual(plan_cache.hits, hits + 1)
+
+    def test_template(self):
+        # 数値だけが異なるtoken列はtemplateを共有する
+        plan1 = compile_plan([12, "s_month", 2, "s_times", "d_tuesday"])
+        hits = template_cache.hits
+        plan2 = compile_plan([11, "s_month", 3, "s_times", "d_tuesday"])
+        self.assertEqual(template_cache.hits, hits + 1)
+        self.assertIs(plan1.template, plan2.template)
+        self.assertEqual(plan1.template.ops[0], Instr("set", "month", Param(0, 0)))
+        self.assertEqual(plan2.params, (11, 3))
+        self.assertEqual(plan2.ops, (Instr("set", "month", 11),
+                                     Instr("scope", "month", None),
+                                     Instr("filter", "wday", frozenset([2])),
+                                     Instr("nth", "day", 3)))
+        self.assertNotEqual(plan1, plan2)
+
+        # 和暦の年も引数にoffsetを足して束縛する
+        plan = compile_plan(["p_heisei", 31, "s_year"])
+        self.assertEqual(plan.template.ops, (Instr("set", "year", Param(0, 1988)),))
+        self.assertEqual(plan.ops, (Instr("set", "year", 2019),))
+        self.assertEqual(bind(plan.template, (1,)).ops, (Instr("set", "year", 1989),))
+
+    def test_evaluate(self):
+        now = datetime(2018, 1, 1) # 月曜日
+
+        # 来月の月末
+        dates = evaluate(compile_plan(["o_next", "s_month", "o_last", "s_day"]), now)
+        self.assertEqual(dates, [datetime(2018, 2, 28)])
+
+        # 来週の土日
+        dates = evaluate(compile_plan(["o_next", "s_week", "d_saturday", "o_or", "d_sunday"]), now)
+        self.assertEqual(dates, [datetime(2018, 1, 13), datetime(2018, 1, 14)])
+
+        # 12月の2回目の火曜日
+        dates = evaluate(compile_plan([12, "s_month", 2, "s_times", "d_tuesday"]), now)
+        self.assertEqual(dates, [datetime(2018, 12, 11)])
+
+        # 次の月曜日 (当日は含まない)
+        dates = evaluate(compile_plan(["o_next", "d_monday"]), now)
+        self.assertEqual(dates, [datetime(2018, 1, 8)])
+
+        # 明日
+        dates = evaluate(compile_plan(["d_tomorrow"]), now)
+        self.assertEqual(dates, [datetime(2018, 1, 2)])
+
+        # 2020年の13日の金曜日
+        dates = evaluate(compile_plan([2020, "s_year", 13, "s_day", "d_friday"]), now)
+        self.assertEqual(dates, [datetime(2020, 3, 13), datetime(2020, 11, 13)])
+
+        # 月末, 月初は基準日を含む月から選ぶ
+        dates = evaluate(compile_plan(["d_monthend"]), datetime(2018, 2, 10))
+        self.assertEqual(dates, [datetime(2018, 2, 28)])
+        dates = evaluate(compile_plan(["o_last", "s_day"]), now)
+        self.assertEqual(dates, [datetime(2018, 1, 31)])
+        dates = evaluate(compile_plan(["d_tomorrow", "o_first", "s_day"]), datetime(2018, 1, 31))
+        self.assertEqual(dates, [datetime(2018, 2, 1)])
+
+        # 選んだ日に曜日を指定した場合はその日の曜日だけを見る
+        dates = evaluate(compile_plan([12, "s_month", 13, "s_day", "d_friday"]), datetime(2018, 1, 10))
+        self.assertEqual(dates, [])
+        dates = evaluate(compile_plan([12, "s_month", 13, "s_day", "d_thursday"]), datetime(2018, 1, 10))
+        self.assertEqual(dates, [datetime(2018, 12, 13)])
+        dates = evaluate(compile_plan([2018, "s_year", 1, "s_month", 13, "s_day", "d_friday"]), now)
+        self.assertEqual(dates, [])
+
+        # 明日が金曜日なら明日
+        dates = evaluate(compile_plan(["d_tomorrow", "d_friday"]), datetime(2018, 1, 4))
+        self.assertEqual(dates, [datetime(2018, 1, 5)])
+
+        # 基準日の"n回目"は基準日を含む月から選ぶ
+        dates = evaluate(compile_plan([2, "s_times", "d_tuesday"]), datetime(2018, 1, 20))
+        self.assertEqual(dates, [datetime(2018, 1, 9)])
+        dates = evaluate(compile_plan(["d_tomorrow", 2, "s_times", "d_tuesday"]), datetime(2018, 1, 31))
+        self.assertEqual(dates, [datetime(2018, 2, 13)])
+
+        # 存在しない日
+        dates = evaluate(compile_plan([2, "s_month", 30, "s_day"]), now)
+        self.assertEqual(dates, [])
+        dates = evaluate(compile_plan([12, "s_month", 0, "s_day"]), now)
+        self.assertEqual(dates, [])
+        with self.assertRaises(ValueError):
+            evaluate(compile_plan([13, "s_month"]), now)
+
+    def test_evaluate_many(self):
+        token_lists = [
+            ["o_next", "s_month", "o_last", "s_day"],
+            ["o_next", "s_week", "d_saturday", "o_or", "d_sunday"],
+            [12, "s_month", 2, "s_times", "d_tuesday"],
+            ["o_next", "d_monday"],
+            [2020, "s_year", 13, "s_day", "d_friday"],
+            [15, "s_day"],
+            ["d_friday"],
+            [2, "s_times", "d_tuesday"],
+            [12, "s_month", 13, "s_day", "d_friday"],
+            ["d_monthend"],
+        ]
+        references = [datetime(2017, 12, 1).toordinal() + i * 5 for i in range(80)]
+        for tokens in token_lists:
+            plan = compile_plan(tokens)
+            expected = [[d.toordinal() for d in evaluate(plan, datetime(*dateutil._ord2ymd(o)))]
+                        for o in references]
+            results = evaluate_many(plan, references)
+            self.assertEqual([list(r) for r in results], expected)
+            results = evaluate_many(plan, [datetime(*dateutil._ord2ymd(o)) for o in references])
+            self.assertEqual([list(r) for r in results], expected)
+
+    def test_evaluate_many_error(self):
+        # 評価できない命令はevaluateと同じくValueError
+        plan = bind(Template((Instr("set", "week", Param(0, 0)),), 1), (3,))
+        with self.assertRaises(ValueError):
+            evaluate(plan, datetime(2018, 1, 1))
+        with self.assertRaises(ValueError):
+            evaluate_many(plan, [1, 2])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_evaluate_many_numpy(self):
+        plan = compile_plan(["o_next", "s_month", "o_last", "s_day"])
+        references = numpy.array(["2018-01-01", "2018-01-31", "2018-02-01"], dtype="datetime64[D]")
+        results = evaluate_many(plan, references)
+        self.assertEqual(results, [(datetime(2018, 2, 28).toordinal(),)] * 2 +
+                                  [(datetime(2018, 3, 31).toordinal(),)])
+
+    def test_fold(self):
+        # 年を指定すれば基準日によらないので, compile時に評価する
+        plan = compile_plan(["p_heisei", 30, "s_year", 12, "s_month"])
+        self.assertEqual(len(plan.folded), 31)
+        self.assertEqual(plan.folded[0], datetime(2018, 12, 1).toordinal())
+        self.assertEqual(evaluate(plan, datetime(1990, 5, 5))[-1], datetime(2018, 12, 31))
+        plan = compile_plan([2020, "s_year", 13, "s_day", "d_friday"])
+        self.assertEqual(plan.folded, (datetime(2020, 3, 13).toordinal(), datetime(2020, 11, 13).toordinal()))
+        self.assertEqual(evaluate_many(plan, [1, 2, 3]), [plan.folded] * 3)
+
+        # 前もって評価した結果は評価時と一致する
+        token_lists = [
+            [2020, "s_year", 2, "s_month", "o_last", "s_day"],
+            [2020, "s_year", 12, "s_month", 2, "s_times", "d_tuesday"],
+            [31, "s_day", 2020, "s_year"],
+            [2, "s_month", 2020, "s_year", 29, "s_day"],
+        ]
+        for tokens in token_lists:
+            plan = compile_plan(tokens)
+            unfolded = plan._replace(folded=None)
+            for now in (datetime(2018, 2, 10), datetime(2018, 3, 10)):
+                self.assertEqual(evaluate(plan, now), evaluate(unfolded, now))
+
+        # 評価時のエラーはcompile時には送出しない
+        plan = compile_plan([2020, "s_year", 13, "s_month"])
+        self.assertIsNone(plan.folded)
+        with self.assertRaises(ValueError):
+            evaluate(plan, datetime(2018, 1, 1))
+        plan = compile_plan([10000, "s_year"])
+        self.assertIsNone(plan.folded)
+        with self.assertRaises(ValueError):
+            evaluate(plan, datetime(2018, 1, 1))
+
+        # 基準日に依存するものは評価しない
+        self.assertIsNone(compile_plan([31, "s_day", 2020, "s_year"]).folded)
+        self.assertIsNone(compile_plan([12, "s_month", 2, "s_times", "d_tuesday"]).folded)
+        self.assertIsNone(compile_plan(["o_next", "s_year"]).folded)
+
+
+class TestResolutionCache(unittest.TestCase):
+    def test_rollover(self):
+        cache = ResolutionCache(maxsize=8)
+        tomorrow = compile_plan(["d_tomorrow"])
+        weekend = compile_plan(["o_next", "s_week", "d_saturday", "o_or", "d_sunday"])
+        now = datetime(2018, 1, 1, 9, 30)
+        dates = cache.evaluate(tomorrow, now)
+        self.assertEqual(dates, (datetime(2018, 1, 2),))
+        self.assertIs(cache.evaluate(tomorrow, datetime(2018, 1, 1, 18)), dates)
+        cache.evaluate(weekend, now)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["size"], 2)
+
+        # 日付が変わると前日の結果は捨てる
+        dates = cache.evaluate(tomorrow, datetime(2018, 1, 2))
+        self.assertEqual(dates, (datetime(2018, 1, 3),))
+        self.assertEqual(cache.day, datetime(2018, 1, 2).toordinal())
+        stats = cache.stats()
+        self.assertEqual((stats["rollovers"], stats["expired"], stats["size"]), (1, 2, 1))
+
+        # 前日の基準日は評価するがcacheしない
+        self.assertEqual(cache.evaluate(tomorrow, now), (datetime(2018, 1, 2),))
+        self.assertEqual(cache.stats()["stale"], 1)
+        self.assertEqual(cache.stats()["size"], 1)
@@ -0,0 +1,28 @@
+import unittest
+
+import str2date.lexer as lx
+from str2date.prefilter import Prefilter
+from str2date.trie import TokenTrie
+
+class TestPrefilter(unittest.TestCase):
+    def test_may_contain(self):
+        tokens = {"来週": "o_next_week", "火曜日": "d_tuesday", "[": "x"}
+        for prefilter in [Prefilter(tokens), Prefilter(TokenTrie(tokens))]:
+            self.assertTrue(prefilter.may_contain("来週の予定"))
+            self.assertTrue(prefilter.may_contain("第3四半期"))
+            self.assertTrue(prefilter.may_contain("二十日"))
+            self.assertTrue(prefilter.may_contain("a[b"))
+            self.assertFalse(prefilter.may_contain("こんにちは"))
+            self.assertFalse(prefilter.may_contain(""))
+            self.assertEqual(prefilter.reject_rate, 2 / 6)
+
+    def test_filter(self):
+        tokens = {"月": "s_month", "来": "o_next"}
+        texts = ["12月", "よろしく", "来月", "ありがとう", "曜"]
+        prefilter = Prefilter(tokens)
+        passed = list(prefilter.filter(texts))
+        self.assertEqual(passed, ["12月", "来月"])
+        for text in texts:
+            if text not in passed:
+                self.assertEqual(lx.lexer(text, tokens), [])
+        self.assertEqual(prefilter.rejected, 3)
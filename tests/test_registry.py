@@ -0,0 +1,74 @@
+import os
+import time
+
+from str2date.cache import LexerCache
+from str2date.registry import TokenRegistry
+from tests import DISAMBIGUATION_MAP, TempDirTestCase
+
+def versioned(r):
+    return r.version, r.result
+
+class TestTokenRegistry(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmpdir, "tokens.tsv")
+        self.write({"月": "a_moon"})
+
+    def write(self, tokens):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            for token, normalized in tokens.items():
+                fp.write("%s\t%s\n" % (token, normalized))
+        os.replace(tmp, self.path)
+
+    def test_reload(self):
+        registry = TokenRegistry(self.path, DISAMBIGUATION_MAP)
+        self.assertEqual(versioned(registry.lexer("令和2年12月")), (1, [2, 12, "s_month"]))
+        # ファイルが変わらなければ読み込み直さない
+        self.assertFalse(registry.reload())
+
+        old = registry.snapshot
+        self.write({"月": "a_moon", "令和": "p_reiwa", "年": "s_year"})
+        self.assertTrue(registry.reload())
+        self.assertEqual(versioned(registry.lexer("令和2年12月")),
+                         (2, ["p_reiwa", 2, "s_year", 12, "s_month"]))
+        self.assertNotEqual(registry.snapshot.fingerprint, old.fingerprint)
+        # 差し替え前の辞書はそのまま使える
+        self.assertEqual(old.version, 1)
+        self.assertFalse("令和" in old.tokens)
+
+    def test_fingerprint(self):
+        # versionはregistry毎に数えるが, fingerprintは辞書の内容で決まる
+        registry = TokenRegistry(self.path, DISAMBIGUATION_MAP)
+        self.write({"月": "s_month"})
+        other = TokenRegistry(self.path, DISAMBIGUATION_MAP)
+        self.assertEqual(registry.version, other.version)
+        self.assertNotEqual(registry.lexer("12月").fingerprint, other.lexer("12月").fingerprint)
+        self.assertTrue(registry.reload())
+        self.assertEqual(registry.lexer("12月").fingerprint, other.lexer("12月").fingerprint)
+
+    def test_lexer_cache(self):
+        registry = TokenRegistry(self.path, DISAMBIGUATION_MAP)
+        cache = LexerCache(registry)
+        self.assertEqual(cache.lexer("12月"), (12, "s_month"))
+        # 差し替え後は古い結果を返さない
+        self.write({"月": "s_moon"})
+        self.assertTrue(registry.reload())
+        self.assertEqual(cache.lexer("12月"), (12, "s_moon"))
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 2, "evictions": 0, "size": 2})
+
+    def test_compiled(self):
+        registry = TokenRegistry(self.compile_tokens({"月": "a_moon"}))
+        self.assertEqual(registry.lexer("12月").result, [12, "s_month"])
+
+    def test_watch(self):
+        registry = TokenRegistry(self.path, DISAMBIGUATION_MAP, interval=0.01)
+        registry.start()
+        try:
+            self.write({"月": "a_moon", "来": "o_next"})
+            deadline = time.time() + 5
+            while registry.version == 1 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(versioned(registry.lexer("来月")), (2, ["o_next", "s_month"]))
+        finally:
+            registry.stop()
@@ -0,0 +1,48 @@
+import str2date.lexer as lx
+from str2date.scanner import AhoCorasick, scan
+from str2date.tokenfile import MappedTokens
+from tests import DISAMBIGUATION_MAP, TOKENS, TempDirTestCase
+
+class TestScanner(TempDirTestCase):
+    def test_longest_matches(self):
+        ac = AhoCorasick({"a": "1", "aa": "2", "aaa": "3", "ba": "4"})
+        matches = ac.longest_matches("baaa")
+        self.assertEqual(matches[0], (2, "4"))
+        self.assertEqual(matches[1], (4, "3"))
+        self.assertEqual(matches[2], (4, "2"))
+        self.assertEqual(matches[3], (4, "1"))
+
+    def test_scan(self):
+        ac = AhoCorasick(TOKENS)
+        text = "会議は来週の火曜日に延期, 打ち上げは12月25日です"
+        spans = scan(text, ac, DISAMBIGUATION_MAP)
+        self.assertEqual(len(spans), 2)
+        start, end, result = spans[0]
+        self.assertEqual(text[start:end], "来週の火曜日")
+        self.assertEqual(result, ["o_next", "s_week", "d_tuesday"])
+        start, end, result = spans[1]
+        self.assertEqual(text[start:end], "12月25日")
+        self.assertEqual(result, [12, "s_month", 25, "s_day"])
+
+    def test_scan_same_as_lexer(self):
+        ac = AhoCorasick(TOKENS)
+        for text in ["次のゴールデンウィーク", "5月の土日", "2020年12月", "火月"]:
+            spans = scan(text, ac, DISAMBIGUATION_MAP)
+            self.assertEqual(len(spans), 1)
+            self.assertEqual(spans[0][2], lx.lexer(text, TOKENS, DISAMBIGUATION_MAP))
+
+    def test_scan_docstring(self):
+        spans = scan("会議は来週の火曜日に延期します", AhoCorasick(TOKENS), DISAMBIGUATION_MAP)
+        self.assertEqual(spans, [(3, 9, ["o_next", "s_week", "d_tuesday"])])
+
+    def test_scan_compiled_tokens(self):
+        # disambiguation_mapを省略すると辞書が持っているものを使う
+        with MappedTokens(self.compile_tokens()) as tokens:
+            spans = scan("12月25日", AhoCorasick(tokens))
+        self.assertEqual(spans, [(0, 6, [12, "s_month", 25, "s_day"])])
+
+    def test_scan_max_gap(self):
+        ac = AhoCorasick(TOKENS)
+        spans = scan("来週の火曜", ac, DISAMBIGUATION_MAP, max_gap=0)
+        self.assertEqual([(s, e) for s, e, _ in spans], [(0, 2), (3, 5)])
+        self.assertEqual(scan("なにもない", ac, DISAMBIGUATION_MAP), [])
@@ -37,6 +37,49 @@ class TestTimeSet(unittest.TestCase):
         self.assertTrue(bts.check(1))
         self.assertTrue(bts.check(3))
 
+    def test_select_rank(self):
+        # 2018年12月の火曜日
+        t = DayTimeSet()
+        for d in (4, 11, 18, 25):
+            t.add(d)
+        self.assertEqual(t.select(2), 11)
+        self.assertIsNone(t.select(5))
+        self.assertEqual(t.rank(18), 2)
+
+        t = YearSet()
+        for y in (2020, 2018, 2019, 2018):
+            t.add(y)
+        self.assertEqual(t.select(1), 2018)
+        self.assertEqual(t.select(3), 2020)
+        self.assertIsNone(t.select(4))
+        self.assertEqual(t.rank(2020), 2)
+
+    def test_frozen(self):
+        t = WdayTimeSet()
+        t.add(6)
+        t.add(7)
+        f = t.freeze()
+        self.assertEqual(f, WEEKEND)
+        self.assertEqual(hash(f), hash(WEEKEND))
+        self.assertEqual(f.active(), [6, 7])
+        self.assertTrue(f.check(6))
+        for mutate in (lambda: f.add(1), lambda: f.set(1), lambda: f.shift(1), f.set_all,
+                       f.reset, lambda: f.remove(6)):
+            with self.assertRaises(TypeError):
+                mutate()
+
+        # 桁が同じでもclassが異なれば別の集合
+        d = DayTimeSet()
+        d.add(6)
+        d.add(7)
+        self.assertNotEqual(d.freeze(), WEEKEND)
+
+        t = WEEKDAYS.thaw()
+        self.assertIsInstance(t, WdayTimeSet)
+        t.add(6)
+        self.assertEqual(WEEKDAYS.active(), [1, 2, 3, 4, 5])
+        self.assertEqual(MONTH_DAYS[30].timeset.last(), 30)
+
     def test_inttimeset(self):
         its = IntTimeSet()
         # はじめは集合に何も含まれない
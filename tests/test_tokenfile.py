@@ -0,0 +1,54 @@
+import mmap
+import pickle
+from unittest import mock
+
+import str2date.lexer as lx
+from str2date.tokenfile import MappedTokens
+from tests import DISAMBIGUATION_MAP, TOKENS, TempDirTestCase
+
+class TestTokenFile(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.compile_tokens()
+
+    def test_mapping(self):
+        with MappedTokens(self.path) as tokens:
+            self.assertEqual(len(tokens), len(TOKENS))
+            self.assertEqual(dict(tokens.items()), TOKENS)
+            self.assertEqual(tokens["火曜"], "d_tuesday")
+            self.assertFalse("火曜日の" in tokens)
+            self.assertEqual(tokens.disambiguation_map, DISAMBIGUATION_MAP)
+            self.assertEqual(tokens.longest_match("次の火曜日", 2), (5, "d_tuesday"))
+            self.assertIsNone(tokens.longest_match("次の火曜日", 1))
+
+    def test_longest_match_decodes_once(self):
+        with MappedTokens(self.path) as tokens, \
+                mock.patch.object(tokens, "_value", wraps=tokens._value) as value:
+            self.assertEqual(tokens.longest_match("火曜日に"), (3, "d_tuesday"))
+            self.assertEqual(value.call_count, 1)
+
+    def test_lexer(self):
+        with MappedTokens(self.path) as tokens:
+            for text in ["次のゴールデンウィークの最終日", "12月の火曜日", "5月の日月火"]:
+                self.assertEqual(lx.lexer(text, tokens),
+                                 lx.lexer(text, TOKENS, DISAMBIGUATION_MAP))
+
+    def test_pickle(self):
+        with MappedTokens(self.path) as tokens:
+            copied = pickle.loads(pickle.dumps(tokens))
+            self.assertEqual(dict(copied.items()), TOKENS)
+            copied.close()
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as fp:
+            fp.write(b"\0" * 64)
+        buffers = []
+        original = mmap.mmap
+        def mapped(*args, **kwargs):
+            buffers.append(original(*args, **kwargs))
+            return buffers[-1]
+        with mock.patch("str2date.tokenfile.mmap.mmap", side_effect=mapped), \
+                self.assertRaises(ValueError):
+            MappedTokens(self.path)
+        # 例外を投げる前にmmapを閉じる
+        self.assertTrue(buffers[0].closed)
@@ -0,0 +1,65 @@
+import unittest
+
+import str2date.lexer as lx
+from str2date.trie import LayeredTrie, TokenTrie
+
+class TestTokenTrie(unittest.TestCase):
+    def test_longest_match(self):
+        trie = TokenTrie({"a": "1", "aa": "2", "aaa": "3"})
+        self.assertEqual(trie.longest_match("aaaa"), (3, "3"))
+        self.assertEqual(trie.longest_match("baa", 1), (3, "2"))
+        self.assertIsNone(trie.longest_match("baa"))
+
+    def test_prefix_matches(self):
+        trie = TokenTrie({"火": "d_tuesday", "火曜": "d_tuesday", "火曜日": "d_tuesday"})
+        matches = trie.prefix_matches("次の火曜日", 2)
+        self.assertEqual(matches, [(3, "d_tuesday"), (4, "d_tuesday"), (5, "d_tuesday")])
+
+    def test_mapping(self):
+        tokens = {"次": "o_next", "次の": "o_next", "月": "a_moon"}
+        trie = TokenTrie(tokens)
+        self.assertEqual(len(trie), 3)
+        self.assertTrue("次の" in trie)
+        self.assertFalse("の" in trie)
+        self.assertEqual(trie["月"], "a_moon")
+        with self.assertRaises(KeyError):
+            trie["の"]
+        self.assertEqual(dict(trie.items()), tokens)
+
+    def test_extends(self):
+        trie = TokenTrie({"来": "o_next", "来週": "o_next_week"})
+        self.assertTrue(trie.extends("来"))
+        self.assertFalse(trie.extends("来週"))
+        self.assertTrue(trie.extends("の来", 1))
+        self.assertFalse(trie.extends("来月"))
+
+
+class TestLayeredTrie(unittest.TestCase):
+    def test_overlay(self):
+        base = TokenTrie({"次": "o_next", "ゴールデンウィーク": "d_goldenweek", "創": "x_base"})
+        tenant = LayeredTrie(base, {"創立記念日": "d_foundation_day", "次": "o_next_tenant"})
+        self.assertEqual(tenant.longest_match("創立記念日"), (5, "d_foundation_day"))
+        self.assertEqual(tenant.longest_match("創業"), (1, "x_base"))
+        self.assertEqual(tenant.prefix_matches("創立記念日"), [(1, "x_base"), (5, "d_foundation_day")])
+        self.assertEqual(tenant["次"], "o_next_tenant")
+        self.assertEqual(tenant["ゴールデンウィーク"], "d_goldenweek")
+        self.assertTrue(tenant.extends("創立"))
+        self.assertEqual(len(tenant), 4)
+        # baseは変更されない
+        self.assertFalse("創立記念日" in base)
+        self.assertEqual(base["次"], "o_next")
+        self.assertNotEqual(tenant.fingerprint, base.fingerprint)
+
+    def test_len(self):
+        base = TokenTrie({"次": "o_next", "月": "s_month"})
+        # baseのtokenは列挙しない
+        base.items = None
+        tenant = LayeredTrie(base, {"次": "o_next_tenant", "創立記念日": "d_foundation_day"},
+                             {"創立記念日": "d_foundation", "祝日": "d_holiday"})
+        self.assertEqual(len(tenant), 4)
+
+    def test_lexer(self):
+        base = TokenTrie({"次": "o_next", "月": "s_month"})
+        tenant = LayeredTrie(base, {"創立記念日": "d_foundation_day"})
+        self.assertEqual(lx.lexer("次の創立記念日", tenant), ["o_next", "d_foundation_day"])
+        self.assertEqual(lx.lexer("次の創立記念日", base), ["o_next"])
@@ -171,6 +171,11 @@ class TestYear(unittest.TestCase):
         d = y.next(datetime(2018, 2, 2))
         self.assertIsNone(d)
 
+        # 時刻を持つ場合も当日は対象から外れる
+        d = y.next(datetime(2018, 1, 1, 12))
+        self.assertEqual(str(d.date()), "2018-02-02")
+        self.assertIsNone(y.next(datetime(2019, 1, 1)))
+
     def test_before(self):
         # 2018/1/1と2018/2/2の二日間を集合に加える
         y = Year(2018, 1, 1)
@@ -188,6 +193,22 @@ class TestYear(unittest.TestCase):
         d = y.before(datetime(2018, 1, 1))
         self.assertIsNone(d)
 
+        # 時刻を持つ場合は当日の0時がdより前になる
+        d = y.before(datetime(2018, 2, 2, 12))
+        self.assertEqual(str(d.date()), "2018-02-02")
+        self.assertIsNone(y.before(datetime(2017, 12, 31)))
+
+    def test_bitset(self):
+        y = Year(2020, 2, 29)
+        y.add(month=12, day=31)
+        days = y.to_bitset()
+        self.assertEqual(days.digit, 366)
+        self.assertEqual(days.active(), [60, 366])
+
+        y = Year(2020, 1, 1)
+        y.from_bitset(days)
+        self.assertEqual([str(d.date()) for d in y.active()], ["2020-02-29", "2020-12-31"])
+
     def test_active(self):
         " common day "
         y = Year(2020, 2, 28)
@@ -249,6 +270,14 @@ class TestYear(unittest.TestCase):
         dates = y.active()
         self.assertEqual(len(dates), 0)
 
+        " 前にずらす. あふれた分はなくなる "
+        y = Year(2018, 3, 1)
+        y.add(month=1, day=1)
+        y.shift(day=-1)
+        dates = y.active()
+        self.assertEqual(len(dates), 1)
+        self.assertEqual((dates[0].year, dates[0].month, dates[0].day), (2018, 2, 28))
+
         " multiple shifts."
         y = Year(2018, 1, 1)
         y.add(month=3, day=31)